@@ -1,6 +1,4 @@
-from sklearn import metrics
 from teradataml import (
-    get_context,
     DataFrame,
     PMMLPredict,
     configure
@@ -8,9 +6,11 @@ from teradataml import (
 from tmo import (
     record_evaluation_stats,
     tmo_create_context,
-    store_byom_tmp,
     ModelContext
 )
+from .model_registry import register_model, get_model, get_model_query
+from .plot_service import PlotService
+from .stages import StageRunner, Result
 
 import os
 import json
@@ -18,25 +18,20 @@ import json
 configure.byom_install_location = os.environ.get("AOA_BYOM_INSTALL_DB", "MLDB")
 
 
-def plot_confusion_matrix(cf, img_filename):
-    import itertools
-    import matplotlib.pyplot as plt
-    plt.imshow(cf, cmap=plt.cm.Blues, interpolation='nearest')
-    plt.colorbar()
-    plt.title('Confusion Matrix')
-    plt.xlabel('Predicted')
-    plt.ylabel('Actual')
-    plt.xticks([0, 1], ['0', '1'])
-    plt.yticks([0, 1], ['0', '1'])
+def confusion_metrics(tp, fp, fn, tn):
+    # same definitions as sklearn's binary metrics, returning 0 where they are undefined
+    def ratio(num, den):
+        return num / den if den else 0.0
 
-    thresh = cf.max() / 2.
-    for i, j in itertools.product(range(cf.shape[0]), range(cf.shape[1])):
-        plt.text(j, i, format(cf[i, j], 'd'), horizontalalignment='center',
-                 color='white' if cf[i, j] > thresh else 'black')
+    precision = ratio(tp, tp + fp)
+    recall = ratio(tp, tp + fn)
 
-    fig = plt.gcf()
-    fig.savefig(img_filename, dpi=500)
-    plt.clf()
+    return {
+        'Accuracy': '{:.2f}'.format(ratio(tp + tn, tp + fp + fn + tn)),
+        'Recall': '{:.2f}'.format(recall),
+        'Precision': '{:.2f}'.format(precision),
+        'f1-score': '{:.2f}'.format(ratio(2 * precision * recall, precision + recall))
+    }
 
 
 def evaluate(context: ModelContext, **kwargs):
@@ -46,14 +41,11 @@ def evaluate(context: ModelContext, **kwargs):
     # this evaluation.py can hanlde both onnx and pmml. usually, you would only need to support one but for 
     # demo purposes, we will show with both as we produce both onnx and pmml in this notebook.
     
-    import glob
-    for file_name in glob.glob(f"{context.artifact_input_path}/model.*"):
-        model_type = file_name.split(".")[-1]
-    
-    with open(f"{context.artifact_input_path}/model.{model_type}", "rb") as f:
-        model_bytes = f.read()
-        
-    model = store_byom_tmp(get_context(), "byom_models_tmp", context.model_version, model_bytes)
+    # the artefact is stored once per content hash (sha256) and referenced by that hash from here on
+    model_id, model_type = register_model(context.artifact_input_path)
+
+    with open(f"{context.artifact_output_path}/byom_model.json", "w+") as f:
+        json.dump({"model_id": model_id, "model_type": model_type}, f)
 
     target_name = context.dataset_info.target_names[0]
 
@@ -65,7 +57,7 @@ def evaluate(context: ModelContext, **kwargs):
             SELECT sc.{context.dataset_info.entity_key}, {target_name}, sc.json_report
                 FROM {mldb}.ONNXPredict(
                     ON ({context.dataset_info.sql}) AS DataTable
-                    ON (SELECT model_version as model_id, model FROM byom_models_tmp) AS ModelTable DIMENSION
+                    ON ({get_model_query(model_id)}) AS ModelTable DIMENSION
                     USING
                         Accumulate('{context.dataset_info.entity_key}', '{target_name}')
             ) sc;
@@ -77,42 +69,72 @@ def evaluate(context: ModelContext, **kwargs):
         byom_target_sql = "CAST(CAST(json_report AS JSON).JSONExtractValue('$.predicted_HasDiabetes') AS INT)"
         
         pmml = PMMLPredict(
-            modeldata=model,
+            modeldata=get_model(model_id),
             newdata=DataFrame.from_query(context.dataset_info.sql),
             accumulate=[context.dataset_info.entity_key, target_name])
         
         predictions_df = pmml.result
 
-    predictions_df.to_sql(table_name="predictions_tmp", if_exists="replace", temporary=True)
-
-    metrics_df = DataFrame.from_query(f"""
-    SELECT 
-        HasDiabetes as y_test, 
-        {byom_target_sql} as y_pred
-        FROM predictions_tmp
-    """)
-    metrics_df = metrics_df.to_pandas()
-
-    y_pred = metrics_df[["y_pred"]]
-    y_test = metrics_df[["y_test"]]
-
-    evaluation = {
-        'Accuracy': '{:.2f}'.format(metrics.accuracy_score(y_test, y_pred)),
-        'Recall': '{:.2f}'.format(metrics.recall_score(y_test, y_pred)),
-        'Precision': '{:.2f}'.format(metrics.precision_score(y_test, y_pred)),
-        'f1-score': '{:.2f}'.format(metrics.f1_score(y_test, y_pred))
-    }
-
-    with open(f"{context.artifact_output_path}/metrics.json", "w+") as f:
-        json.dump(evaluation, f)
-
-    # create confusion matrix plot
-    cf = metrics.confusion_matrix(y_test, y_pred)
-
-    plot_confusion_matrix(cf, f"{context.artifact_output_path}/confusion_matrix")
+    # the steps after the predictions run as soon as what they depend on is done: database work on a thread,
+    # the plot renders in the background (see plot_service.py)
+    hyperparams = context.hyperparams or {}
+    runner = StageRunner(io_workers=int(hyperparams.get("eval_io_workers", 1)))
+    plots = PlotService(context.artifact_output_path,
+                        dpi=int(hyperparams.get("plot_dpi", 500)),
+                        format=hyperparams.get("plot_format", "png"),
+                        workers=int(hyperparams.get("plot_workers", 1)))
+
+    runner.add("write_predictions", predictions_df.to_sql, table_name="predictions_tmp", if_exists="replace",
+               temporary=True, kind="io")
+    runner.add("confusion_counts", confusion_counts, target_name, byom_target_sql, deps=["write_predictions"],
+               kind="io")
+    runner.add("metrics", save_metrics, Result("confusion_counts"), context.artifact_output_path)
+    runner.add("confusion_matrix", plots.submit, "confusion_matrix", "confusion_matrix", Result("metrics"))
 
     # calculate stats if training stats exist
     if os.path.exists(f"{context.artifact_input_path}/data_stats.json"):
-        record_evaluation_stats(features_df=DataFrame.from_query(context.dataset_info.sql),
-                                predicted_df=DataFrame.from_query("SELECT * FROM predictions_tmp"),
-                                context=context)
+        runner.add("record_evaluation_stats", record_stats, context, deps=["write_predictions"], kind="io")
+
+    try:
+        runner.run()
+    finally:
+        timeline = runner.save_timeline(f"{context.artifact_output_path}/evaluation_timeline.json")
+        print("Evaluation stages: " + ", ".join(f"{t['stage']} {t['duration_s'] or 0:.2f}s" for t in timeline))
+        plots.close()
+
+
+def confusion_counts(target_name, byom_target_sql):
+    # compute the confusion counts in-database so only four numbers come back regardless of dataset size
+    counts = DataFrame.from_query(f"""
+    SELECT
+        COALESCE(SUM(CASE WHEN y_test = 1 AND y_pred = 1 THEN 1 ELSE 0 END), 0) AS tp,
+        COALESCE(SUM(CASE WHEN y_test = 0 AND y_pred = 1 THEN 1 ELSE 0 END), 0) AS fp,
+        COALESCE(SUM(CASE WHEN y_test = 1 AND y_pred = 0 THEN 1 ELSE 0 END), 0) AS fn,
+        COALESCE(SUM(CASE WHEN y_test = 0 AND y_pred = 0 THEN 1 ELSE 0 END), 0) AS tn
+        FROM (
+            SELECT
+                {target_name} as y_test,
+                {byom_target_sql} as y_pred
+            FROM predictions_tmp
+        ) p
+    """).to_pandas().reset_index().iloc[0]
+
+    return [int(counts[c]) for c in ["tp", "fp", "fn", "tn"]]
+
+
+def record_stats(context):
+    # the queries are built and run on the io thread, which owns the teradataml connection during the stages
+    record_evaluation_stats(features_df=DataFrame.from_query(context.dataset_info.sql),
+                            predicted_df=DataFrame.from_query("SELECT * FROM predictions_tmp"),
+                            context=context)
+
+
+def save_metrics(counts, output_path):
+    tp, fp, fn, tn = counts
+    evaluation = confusion_metrics(tp, fp, fn, tn)
+
+    with open(f"{output_path}/metrics.json", "w+") as f:
+        json.dump(evaluation, f)
+
+    # confusion matrix plot data (same layout as sklearn: rows actual, columns predicted)
+    return {"matrix": [[tn, fp], [fn, tp]]}
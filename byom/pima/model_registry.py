@@ -0,0 +1,95 @@
+from teradataml import DataFrame, execute_sql
+
+import hashlib
+import os
+
+# supported artefact formats in order of preference when more than one is present
+MODEL_TYPES = ["onnx", "pmml"]
+
+REGISTRY_TABLE = os.environ.get("AOA_BYOM_REGISTRY_TABLE", "byom_models_registry")
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def detect_model_type(artifact_path):
+    for model_type in MODEL_TYPES:
+        if os.path.exists(f"{artifact_path}/model.{model_type}"):
+            return model_type
+
+    raise FileNotFoundError(f"No model.{{{','.join(MODEL_TYPES)}}} artefact found in {artifact_path}")
+
+
+def hash_model(file_name, chunk_size=CHUNK_SIZE):
+    sha256 = hashlib.sha256()
+    with open(file_name, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def create_registry_table(table=REGISTRY_TABLE):
+    try:
+        execute_sql(f"""
+            CREATE MULTISET TABLE {table} (
+                model_id VARCHAR(64) CHARACTER SET LATIN CASESPECIFIC,
+                model_type VARCHAR(16) CHARACTER SET LATIN,
+                model_size BIGINT,
+                created_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+                model BLOB(2097088000)
+            )
+            UNIQUE PRIMARY INDEX (model_id);
+        """)
+    except Exception as e:
+        # 3803: table already exists
+        if "3803" not in str(e):
+            raise
+
+
+def is_registered(model_id, table=REGISTRY_TABLE):
+    df = DataFrame.from_query(f"SELECT COUNT(*) AS cnt FROM {table} WHERE model_id = '{model_id}'")
+    return int(df.to_pandas().reset_index()["cnt"][0]) > 0
+
+
+def upload_model(file_name, model_id, model_type, table=REGISTRY_TABLE):
+    # the whole artefact is held in memory and bound as a single BLOB parameter, the statement is only
+    # executed when the registry doesn't have it yet
+    with open(file_name, "rb") as f:
+        model_bytes = f.read()
+
+    try:
+        execute_sql(f"INSERT INTO {table} (model_id, model_type, model_size, model) VALUES (?, ?, ?, ?)",
+                    [model_id, model_type, len(model_bytes), model_bytes])
+    except Exception as e:
+        # 2801: duplicate unique prime key, a concurrent job registered the same artefact first
+        if "2801" not in str(e):
+            raise
+
+
+def register_model(artifact_path, table=REGISTRY_TABLE):
+    """
+    Store the BYOM artefact in artifact_path in the content-addressed registry table, uploading it only if an
+    artefact with the same sha256 is not already there.
+
+    Returns the model_id (sha256 hex digest) and the model type of the artefact.
+    """
+    model_type = detect_model_type(artifact_path)
+    file_name = f"{artifact_path}/model.{model_type}"
+    model_id = hash_model(file_name)
+
+    create_registry_table(table)
+
+    if is_registered(model_id, table):
+        print(f"Model {model_id} already registered in {table}, skipping upload")
+    else:
+        print(f"Uploading model {model_id} to {table}")
+        upload_model(file_name, model_id, model_type, table)
+
+    return model_id, model_type
+
+
+def get_model_query(model_id, table=REGISTRY_TABLE):
+    return f"SELECT model_id, model FROM {table} WHERE model_id = '{model_id}'"
+
+
+def get_model(model_id, table=REGISTRY_TABLE):
+    return DataFrame.from_query(get_model_query(model_id, table))
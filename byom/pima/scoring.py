@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+# the features of the model. Converted from a DataFrame (as in the notebook), the onnx model has one [None, 1] input
+# per feature named after it, converted from a matrix a single [None, 8] input taking them in this order
+FEATURES = ["NumTimesPrg", "Age", "PlGlcConc", "BloodP", "SkinThick", "TwoHourSerIns", "BMI", "DiPedFunc"]
+
+
+def _to_json_value(value):
+    if isinstance(value, dict):
+        return {str(k): _to_json_value(v) for k, v in value.items()}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+
+def model_inputs(inputs):
+    """(input name, feature index) per onnx model input, the index None for a single input taking every feature."""
+    features = {f.lower(): i for i, f in enumerate(FEATURES)}
+    if len(inputs) == 1 and inputs[0].name.lower() not in features:
+        width = inputs[0].shape[-1] if inputs[0].shape else None
+        if width != len(FEATURES):
+            raise ValueError(f"The model input {inputs[0].name} has shape {inputs[0].shape}, "
+                             f"expected [None, {len(FEATURES)}] for the features {FEATURES}")
+        return [(inputs[0].name, None)]
+
+    unknown = [i.name for i in inputs if i.name.lower() not in features]
+    if unknown:
+        raise ValueError(f"The model inputs {unknown} are not features, expected one of {FEATURES}")
+    return [(i.name, features[i.name.lower()]) for i in inputs]
+
+
+def feed(inputs, X):
+    """The session.run feed of the feature matrix X (in FEATURES order) for the model_inputs."""
+    return {name: X if index is None else np.ascontiguousarray(X[:, index:index + 1]) for name, index in inputs}
+
+
+# Add code required for RESTful API
+class ModelScorer(object):
+    """
+    Local ONNX Runtime scorer for the BYOM model, producing the same json_report as the in-database ONNXPredict
+    so either path can be used interchangeably.
+
+    The inference session is created once and reused. Thread pools can be tuned with the
+    BYOM_ORT_INTRA_OP_THREADS / BYOM_ORT_INTER_OP_THREADS environment variables (0 lets onnxruntime decide).
+    """
+
+    def __init__(self, model_path="artifacts/input/model.onnx", batch_size=1024):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = int(os.environ.get("BYOM_ORT_INTRA_OP_THREADS", 0))
+        options.inter_op_num_threads = int(os.environ.get("BYOM_ORT_INTER_OP_THREADS", 0))
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.inputs = model_inputs(self.session.get_inputs())
+        self.output_names = [output.name for output in self.session.get_outputs()]
+        self.batch_size = batch_size
+
+        # one reusable input buffer per serving thread, grown on demand
+        self._local = threading.local()
+
+    def _buffer(self, rows):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or buffer.shape[0] < rows:
+            buffer = np.empty((max(rows, self.batch_size), len(FEATURES)), dtype=np.float32)
+            self._local.buffer = buffer
+        return buffer[:rows]
+
+    def _to_matrix(self, data):
+        if hasattr(data, "columns"):
+            columns = {str(c).lower(): c for c in data.columns}
+            if all(f.lower() in columns for f in FEATURES):
+                data = data[[columns[f.lower()] for f in FEATURES]]
+            data = data.to_numpy()
+
+        data = np.asarray(data)
+        if data.ndim == 1:
+            data = data.reshape(1, -1)
+
+        if data.dtype == np.float32 and data.flags["C_CONTIGUOUS"]:
+            return data
+
+        buffer = self._buffer(data.shape[0])
+        buffer[...] = data
+        return buffer
+
+    def predict_raw(self, data):
+        """Return the raw onnx outputs (one list per output) for a single row or a batch of rows."""
+        X = self._to_matrix(data)
+        outputs = [[] for _ in self.output_names]
+
+        for start in range(0, X.shape[0], self.batch_size):
+            batch = X[start:start + self.batch_size]
+            for i, result in enumerate(self.session.run(self.output_names, feed(self.inputs, batch))):
+                outputs[i].extend(result)
+
+        return outputs
+
+    def predict(self, data):
+        return np.asarray(self.predict_raw(data)[0])
+
+    def json_report(self, data):
+        """Return one ONNXPredict style json_report string per row, e.g. {"output_label": [1], ...}"""
+        outputs = self.predict_raw(data)
+        return [json.dumps({name: [_to_json_value(values[row])] for name, values in zip(self.output_names, outputs)})
+                for row in range(len(outputs[0]))]
@@ -0,0 +1,156 @@
+"""
+Concurrent runner of the evaluation steps that follow the predictions.
+
+Stages are declared with the stages they depend on, and run as soon as those complete: "io" stages (database
+reads / writes) on a thread pool, "cpu" stages (plots, SHAP) on a process pool and "main" stages inline in the
+calling thread. A stage's arguments may refer to the results of other stages with `Result("name")`, which also
+makes it depend on them. The start / end of every stage is kept and can be saved as a timeline artifact.
+
+The io pool defaults to a single thread since the teradataml context holds one database connection. cpu stages
+run in spawned processes, so their functions and arguments must be picklable and their module importable without
+heavy dependencies (see plots.py).
+"""
+import json
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+
+def _timed(fn, args, kwargs):
+    # runs in the worker, wall clock times so they are comparable across processes
+    start = time.time()
+    result = fn(*args, **kwargs)
+    return result, start, time.time()
+
+
+class Result(object):
+    """Placeholder for the result of stage `name` in the arguments of another stage."""
+
+    def __init__(self, name):
+        self.name = name
+
+
+class Stage(object):
+
+    def __init__(self, name, fn, args, kwargs, deps, kind):
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.kind = kind
+        self.deps = set(deps) | {a.name for a in list(args) + list(kwargs.values()) if isinstance(a, Result)}
+        self.submitted = None
+        self.start = None
+        self.end = None
+        self.status = "pending"
+        self.error = None
+
+
+class StageRunner(object):
+
+    def __init__(self, io_workers=1, cpu_workers=2):
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.stages = {}
+        self.results = {}
+        self._start = None
+
+    def add(self, name, fn, *args, deps=(), kind="main", **kwargs):
+        if kind not in ("main", "io", "cpu"):
+            raise ValueError(f"Unsupported stage kind {kind}, expected main, io or cpu")
+        self.stages[name] = Stage(name, fn, args, kwargs, deps, kind)
+        return self
+
+    def _ready(self):
+        return [s for s in self.stages.values()
+                if s.status == "pending" and all(self.stages[d].status == "done" for d in s.deps)]
+
+    def _resolve(self, value):
+        return self.results[value.name] if isinstance(value, Result) else value
+
+    def run(self):
+        """Run all stages, returning their results by name. Raises the error of the first stage that fails once
+        the stages already running have completed, stages that haven't started yet are skipped."""
+        for stage in self.stages.values():
+            missing = stage.deps - set(self.stages)
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages {sorted(missing)}")
+
+        pools = {
+            "io": ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="stage-io"),
+            "cpu": ProcessPoolExecutor(max_workers=self.cpu_workers, mp_context=multiprocessing.get_context("spawn"))
+            if any(s.kind == "cpu" for s in self.stages.values()) else None
+        }
+        self._start = time.time()
+        running = {}
+        error = None
+        try:
+            while True:
+                # start everything ready, main stages complete inline and may make further stages ready
+                progressed = True
+                while error is None and progressed:
+                    progressed = False
+                    for stage in self._ready():
+                        stage.status = "running"
+                        stage.submitted = time.time()
+                        args = [self._resolve(a) for a in stage.args]
+                        kwargs = {k: self._resolve(v) for k, v in stage.kwargs.items()}
+                        if stage.kind != "main":
+                            running[pools[stage.kind].submit(_timed, stage.fn, args, kwargs)] = stage
+                            continue
+                        stage.start = stage.submitted
+                        try:
+                            self.results[stage.name] = stage.fn(*args, **kwargs)
+                            stage.status = "done"
+                            progressed = True
+                        except Exception as e:
+                            stage.status, stage.error, error = "failed", str(e), error or e
+                        stage.end = time.time()
+
+                if not running:
+                    break
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        self.results[stage.name], stage.start, stage.end = future.result()
+                        stage.status = "done"
+                    except Exception as e:
+                        stage.end = time.time()
+                        stage.status, stage.error, error = "failed", str(e), error or e
+        finally:
+            for pool in pools.values():
+                if pool is not None:
+                    pool.shutdown(wait=True)
+
+        for stage in self.stages.values():
+            if stage.status == "pending":
+                stage.status = "skipped"
+
+        if error is not None:
+            raise error
+        return self.results
+
+    def timeline(self):
+        """Submit / start / end of every stage in seconds from the start of the run, in submit order. The time
+        between submit and start is spent waiting for a free worker (and starting the worker process)."""
+        stages = sorted(self.stages.values(), key=lambda s: (s.submitted is None, s.submitted or 0))
+        return [{
+            "stage": s.name,
+            "kind": s.kind,
+            "deps": sorted(s.deps),
+            "status": s.status,
+            "submitted_s": s.submitted - self._start if s.submitted is not None else None,
+            "start_s": s.start - self._start if s.start is not None else None,
+            "end_s": s.end - self._start if s.end is not None else None,
+            "duration_s": s.end - s.start if s.start is not None and s.end is not None else None,
+            "error": s.error
+        } for s in stages]
+
+    def save_timeline(self, filename):
+        timeline = self.timeline()
+        with open(filename, "w+") as f:
+            json.dump({"wall_time_s": max((t["end_s"] or 0) for t in timeline) if timeline else 0.0,
+                       "stages": timeline}, f, indent=2)
+        return timeline
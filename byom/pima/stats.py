@@ -0,0 +1,217 @@
+"""
+Single pass, mergeable computation of the data_stats.json statistics.
+
+Each chunk is reduced to per-column count/min/max/mean and central moments (M2, M3, M4) plus histogram counts
+against edges fixed up front. Partial results from chunks or partitions are combined with the pairwise update
+of Chan et al. / Pébay, so they can be computed in parallel and merged in any order.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import json
+import numpy as np
+import pandas as pd
+
+DEFAULT_BINS = 10
+
+
+def edges_from_stats(data_stats):
+    """Reuse the histogram edges of a previous data_stats.json (e.g. the training stats)."""
+    return {name: feature["statistics"]["histogram"]["edges"]
+            for name, feature in data_stats["features"].items()
+            if "histogram" in feature.get("statistics", {})}
+
+
+def edges_from_range(minimum, maximum, bins=DEFAULT_BINS):
+    return np.linspace(minimum, maximum, bins + 1).tolist()
+
+
+class StatsAccumulator(object):
+    """
+    Accumulates the data_stats.json statistics of the continuous features and the frequencies of the categorical
+    features over any number of pandas chunks. Column names are matched case-insensitively and reported lowercase,
+    as in data_stats.json.
+    """
+
+    def __init__(self, features, edges, categorical=None):
+        self.features = [f.lower() for f in features]
+        self.categorical = [c.lower() for c in (categorical or [])]
+
+        edges = {k.lower(): v for k, v in edges.items()}
+        missing = [f for f in self.features if f not in edges]
+        if missing:
+            raise ValueError(f"Histogram edges must be fixed up front, missing for {missing}")
+        self.edges = [np.asarray(edges[f], dtype=np.float64) for f in self.features]
+
+        k = len(self.features)
+        self.n = np.zeros(k)
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.m3 = np.zeros(k)
+        self.m4 = np.zeros(k)
+        self.hist = [np.zeros(len(e) - 1) for e in self.edges]
+        self.frequency = {c: {} for c in self.categorical}
+        self.num_rows = 0
+
+    def _empty_like(self):
+        return StatsAccumulator(self.features, dict(zip(self.features, self.edges)), self.categorical)
+
+    def update(self, df):
+        """Fold a pandas chunk into the running statistics."""
+        columns = {str(c).lower(): c for c in df.columns}
+        chunk = self._empty_like()
+        chunk.num_rows = len(df)
+
+        if self.features and len(df):
+            X = df[[columns[f] for f in self.features]].to_numpy(dtype=np.float64)
+            valid = ~np.isnan(X)
+
+            chunk.n = valid.sum(axis=0).astype(np.float64)
+            chunk.min = np.where(valid, X, np.inf).min(axis=0)
+            chunk.max = np.where(valid, X, -np.inf).max(axis=0)
+            chunk.mean = np.divide(np.where(valid, X, 0).sum(axis=0), chunk.n,
+                                   out=np.zeros_like(chunk.n), where=chunk.n > 0)
+
+            d = np.where(valid, X - chunk.mean, 0)
+            d2 = d * d
+            chunk.m2 = d2.sum(axis=0)
+            chunk.m3 = (d2 * d).sum(axis=0)
+            chunk.m4 = (d2 * d2).sum(axis=0)
+
+            for i, edges in enumerate(chunk.edges):
+                values = X[valid[:, i], i]
+                # values outside the edges are counted in the first / last bin
+                bins = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(edges) - 2)
+                chunk.hist[i] = np.bincount(bins, minlength=len(edges) - 1).astype(np.float64)
+
+        for c in self.categorical:
+            counts = df[columns[c]].dropna().value_counts()
+            chunk.frequency[c] = {str(k): float(v) for k, v in counts.items()}
+
+        return self.merge(chunk)
+
+    def merge(self, other):
+        """Combine the statistics of another accumulator (e.g. from another partition) into this one."""
+        n_a, n_b = self.n, other.n
+        n = n_a + n_b
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = other.mean - self.mean
+            delta_n = np.where(n > 0, delta / n, 0)
+
+        mean = self.mean + delta_n * n_b
+        m2 = self.m2 + other.m2 + delta * delta_n * n_a * n_b
+        m3 = (self.m3 + other.m3
+              + delta * delta_n ** 2 * n_a * n_b * (n_a - n_b)
+              + 3 * delta_n * (n_a * other.m2 - n_b * self.m2))
+        m4 = (self.m4 + other.m4
+              + delta * delta_n ** 3 * n_a * n_b * (n_a * n_a - n_a * n_b + n_b * n_b)
+              + 6 * delta_n ** 2 * (n_a * n_a * other.m2 + n_b * n_b * self.m2)
+              + 4 * delta_n * (n_a * other.m3 - n_b * self.m3))
+
+        self.n, self.mean, self.m2, self.m3, self.m4 = n, mean, m2, m3, m4
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.hist = [a + b for a, b in zip(self.hist, other.hist)]
+        for c in self.categorical:
+            for k, v in other.frequency[c].items():
+                self.frequency[c][k] = self.frequency[c].get(k, 0.0) + v
+        self.num_rows += other.num_rows
+
+        return self
+
+    def _statistics(self, i):
+        n, mean, m2, m3, m4 = self.n[i], self.mean[i], self.m2[i], self.m3[i], self.m4[i]
+        if n == 0:
+            return {"cnt": 0.0}
+
+        # population moments, matching the existing data_stats.json where var = css / cnt
+        var = m2 / n
+        std = np.sqrt(var)
+        return {
+            "cnt": float(n),
+            "min": float(self.min[i]),
+            "max": float(self.max[i]),
+            "mean": float(mean),
+            "std": float(std),
+            "skew": float(np.sqrt(n) * m3 / m2 ** 1.5) if m2 > 0 else 0.0,
+            "kurt": float(n * m4 / (m2 * m2) - 3.0) if m2 > 0 else 0.0,
+            "ste": float(std / np.sqrt(n)),
+            "cv": float(100.0 * std / mean) if mean != 0 else 0.0,
+            "var": float(var),
+            "sum": float(mean * n),
+            "uss": float(m2 + n * mean * mean),
+            "css": float(m2),
+            "histogram": {
+                "edges": self.edges[i].tolist(),
+                "values": self.hist[i].tolist()
+            }
+        }
+
+    def to_dict(self, targets=None):
+        """Return the statistics in the data_stats.json schema."""
+        targets = [t.lower() for t in (targets or [])]
+
+        def categorical(c):
+            labels = {k: k for k in sorted(self.frequency[c])}
+            return {
+                "type": "categorical",
+                "group": "default",
+                "category_dictionary": labels,
+                "category_labels": labels,
+                "ordinal": False,
+                "statistics": {"frequency": dict(sorted(self.frequency[c].items()))}
+            }
+
+        data_stats = {"num_rows": self.num_rows, "features": {}, "targets": {}}
+        for i, f in enumerate(self.features):
+            section = "targets" if f in targets else "features"
+            data_stats[section][f] = {"type": "continuous", "group": "default", "statistics": self._statistics(i)}
+        for c in self.categorical:
+            section = "targets" if c in targets else "features"
+            data_stats[section][c] = categorical(c)
+
+        return data_stats
+
+
+def compute_stats(chunks, features, edges, categorical=None, targets=None, max_workers=1):
+    """
+    Compute data_stats.json statistics over an iterable of pandas chunks in a single pass. With max_workers > 1
+    up to max_workers chunks are reduced in parallel (numpy releases the GIL) and the partial results merged, so
+    memory stays bounded by the chunks in flight.
+    """
+    result = StatsAccumulator(features, edges, categorical)
+
+    def reduce_chunk(chunk):
+        return StatsAccumulator(features, edges, categorical).update(chunk)
+
+    if max_workers <= 1:
+        for chunk in chunks:
+            result.update(chunk)
+        return result.to_dict(targets)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(executor.submit(reduce_chunk, chunk))
+            if len(in_flight) >= max_workers:
+                result.merge(in_flight.popleft().result())
+        while in_flight:
+            result.merge(in_flight.popleft().result())
+
+    return result.to_dict(targets)
+
+
+def compute_stats_from_query(sql, features, edges, categorical=None, targets=None, chunksize=100000,
+                             max_workers=1):
+    """Stream a query from Vantage in chunks through compute_stats."""
+    from teradataml import get_connection
+
+    return compute_stats(pd.read_sql(sql, get_connection(), chunksize=chunksize), features, edges,
+                         categorical=categorical, targets=targets, max_workers=max_workers)
+
+
+def save_stats(data_stats, filename):
+    with open(filename, "w+") as f:
+        json.dump(data_stats, f, indent=2)
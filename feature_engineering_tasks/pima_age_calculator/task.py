@@ -3,36 +3,137 @@ from tmo import (tmo_create_context, ModelContext)
 import pandas as pd
 import numpy as np
 
-def run_task(context: ModelContext, **kwargs):
-    aoa_create_context()
-    df = DataFrame.from_query("sel * from pima_patient_features")
-    
-    # Convert teradataml DataFrame to pandas DataFrame
-    df_pd = df.to_pandas()
-    
+SOURCE_TABLE = "pima_patient_features"
+TARGET_TABLE = "age_table"
+WATERMARK_TABLE = "age_table_watermark"
+ENTITY_KEY = "PatientId"
+MODES = ("incremental", "reconcile", "full")
+# incremental runs between two reconciles, which also pick up PatientIds added below the watermark
+RECONCILE_EVERY = 24
+
+
+def read_watermark():
+    """Highest PatientId processed so far: the persisted watermark, else the highest PatientId in the target table
+    (e.g. built by a full run before watermarks were recorded), else None when the target table doesn't exist."""
+    for query in [f"SELECT MAX(watermark) AS watermark FROM {WATERMARK_TABLE}",
+                  f"SELECT MAX({ENTITY_KEY}) AS watermark FROM {TARGET_TABLE}"]:
+        try:
+            watermark = DataFrame.from_query(query).to_pandas().reset_index()["watermark"][0]
+        except Exception:
+            # table doesn't exist yet
+            continue
+        if pd.notna(watermark):
+            return int(watermark)
+    return None
+
+
+def runs_since_reconcile():
+    """Incremental runs recorded since the last full or reconcile run (all of them if there was none)."""
+    try:
+        runs = DataFrame(WATERMARK_TABLE).to_pandas(all_rows=True).reset_index()
+    except Exception:
+        # table doesn't exist yet
+        return 0
+    runs = runs.sort_values("updated_at").reset_index(drop=True)
+    reconciled = runs.index[runs["mode"].isin(["full", "reconcile"])]
+    if len(reconciled):
+        runs = runs.iloc[reconciled[-1] + 1:]
+    return int((runs["mode"] == "incremental").sum())
+
+
+def new_patients_query(watermark, prune=True):
+    """
+    The patients not in age_table yet, all of them when it doesn't exist (watermark None).
+
+    The anti-join is what selects the new patients. `prune` additionally limits the scan to PatientIds above the
+    watermark, which assumes PatientIds are assigned in increasing order: a patient loaded late with a lower id is
+    only picked up by the next reconcile (prune=False).
+    """
+    if watermark is None:
+        return f"SELECT * FROM {SOURCE_TABLE}"
+
+    return f"""
+        SELECT f.* FROM {SOURCE_TABLE} f
+        WHERE NOT EXISTS (SELECT 1 FROM {TARGET_TABLE} a WHERE a.{ENTITY_KEY} = f.{ENTITY_KEY})
+        {f"AND f.{ENTITY_KEY} > {watermark}" if prune else ""}
+    """
+
+
+def add_age_features(df_pd):
     # Generate random birthdates
     start_date = pd.to_datetime('1950-01-01')
     end_date = pd.to_datetime('2000-01-01')
 
     df_pd['birthday'] = start_date + (end_date - start_date) * np.random.rand(len(df_pd))
-    
-    # Calculate age
-    df_pd['calculated_age'] = df_pd['birthday'].apply(lambda x: (pd.to_datetime('today') - x).days // 365)
-    
+
+    # Calculate age, vectorized against a single reference date for all rows
+    today = pd.Timestamp.today()
+    df_pd['calculated_age'] = (today - df_pd['birthday']).dt.days // 365
+
     # Remove the original age column
-    df_pd = df_pd.drop(columns=['Age'])
-    
-    # Write pandas DataFrame to a Teradata table
-    copy_to_sql(df = df_pd, table_name = 'age_table', if_exists = 'replace')
-    
+    return df_pd.drop(columns=['Age'])
+
+
+def run_task(context: ModelContext, **kwargs):
+    """
+    Add the birthday / calculated_age features of pima_patient_features to age_table.
+
+    Only the patients not yet in age_table are read and appended. In the default "incremental" mode the scan is
+    also limited to the PatientIds above the watermark of the previous run, so a refresh costs roughly the size of
+    the new data. As that misses PatientIds loaded late below the watermark, every `reconcile_every` (default 24)
+    incremental runs a "reconcile" run checks all patients against age_table instead. The "full" mode rebuilds
+    age_table from all patients. `mode` and `reconcile_every` are hyperparameters or task arguments.
+    """
+    tmo_create_context()
+
+    hyperparams = getattr(context, "hyperparams", None) or {}
+    mode = kwargs.get("mode", hyperparams.get("mode", "incremental"))
+    if mode not in MODES:
+        raise ValueError(f"Unsupported mode {mode}, expected one of {MODES}")
+
+    reconcile_every = int(kwargs.get("reconcile_every", hyperparams.get("reconcile_every", RECONCILE_EVERY)))
+    if mode == "incremental" and reconcile_every > 0 and runs_since_reconcile() >= reconcile_every:
+        mode = "reconcile"
+
+    watermark = read_watermark() if mode != "full" else None
+    print(f"Running in {mode} mode from watermark {watermark}")
+
+    # Convert teradataml DataFrame to pandas DataFrame, only the patients not processed yet
+    df = DataFrame.from_query(new_patients_query(watermark, prune=mode == "incremental"))
+    df_pd = df.to_pandas(all_rows=True)
+    if ENTITY_KEY not in df_pd.columns:
+        # teradataml uses the primary index as the pandas index
+        df_pd = df_pd.reset_index()
+    print(f"Found {len(df_pd)} new patients")
+
+    if len(df_pd):
+        df_pd = add_age_features(df_pd)
+
+        # Write pandas DataFrame to a Teradata table, appending the new patients in bulk
+        copy_to_sql(df=df_pd, table_name=TARGET_TABLE, index=False,
+                    if_exists="append" if watermark is not None else "replace")
+
+    # every run is recorded, even without new patients, to count the runs until the next reconcile. A reconcile
+    # can add patients below the watermark, so the watermark never goes down.
+    watermarks = [watermark] if watermark is not None else []
+    if len(df_pd):
+        watermarks.append(int(df_pd[ENTITY_KEY].max()))
+    if watermarks:
+        copy_to_sql(df=pd.DataFrame({"watermark": [max(watermarks)],
+                                     "rows_added": [len(df_pd)],
+                                     "mode": [mode],
+                                     "updated_at": [pd.Timestamp.now()]}),
+                    table_name=WATERMARK_TABLE, index=False,
+                    if_exists="append" if mode != "full" else "replace")
+
     # Create a teradataml DataFrame from the table
-    df = DataFrame('age_table')
-    
+    df = DataFrame(TARGET_TABLE)
+
     print(df)
     with open(f"{context.artifact_output_path}/age_report.txt", "w") as f:
+        print(f"mode: {mode}, watermark: {watermark}, rows added: {len(df_pd)}", file=f)
         print(df, file=f)
-    
+
     # Store build properties as a file artifact
     with open(f"{context.artifact_output_path}/build_properties.txt", "w") as f:
         f.write(str(kwargs))
-        
\ No newline at end of file
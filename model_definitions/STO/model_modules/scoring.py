@@ -1,7 +1,7 @@
 from teradataml import DataFrame
 from teradatasqlalchemy.types import INTEGER
 from collections import OrderedDict
-from .util import get_df_with_model
+from .util import check_challengers, get_df_with_model, get_shadow_report
 from tmo import (
     check_sto_version,
     tmo_create_context,
@@ -11,6 +11,8 @@ from tmo import (
 
 import base64
 import dill
+import json
+import pandas as pd
 
 
 def score(context: ModelContext, **kwargs):
@@ -19,6 +21,8 @@ def score(context: ModelContext, **kwargs):
 
     model_version = context.model_version
     number_of_amps = context.hyperparams["number_of_amps"]
+    # model versions shadow scored alongside this one, see README.md
+    challenger_versions = context.hyperparams.get("challenger_versions", [])
     model_table = "vmo_sto_partitions"
 
     check_sto_version()
@@ -30,9 +34,11 @@ def score(context: ModelContext, **kwargs):
         except:
             print("Something went wrong trying to cleanup cli model version, maybe it's nothing")
 
+    check_challengers(model_table, challenger_versions)
+
     df = DataFrame.from_query(context.dataset_info.sql)
 
-    def score_partition(partition, features):
+    def score_partition(partition, features, num_challengers):
 
         rows = partition.read()
 
@@ -46,21 +52,46 @@ def score(context: ModelContext, **kwargs):
         out_df = rows[["PatientId"]]
         out_df["prediction"] = model.predict(rows[features])
 
+        for i in range(1, num_challengers + 1):
+            challenger_artefact = rows.loc[rows['n_row'] == 1, f'model_{i}'].iloc[0]
+            if pd.isnull(challenger_artefact):
+                # the challenger has no model for this partition
+                out_df[f"challenger_{i}"] = None
+                continue
+            challenger = dill.loads(base64.b64decode(challenger_artefact))
+            out_df[f"challenger_{i}"] = challenger.predict(rows[features])
+
         return out_df
 
     pdf = df.assign(partition_id=df.PatientId % number_of_amps)
     partitioned_dataset_table = f"partitioned_dataset_{model_version.split('-')[0]}"
     pdf.to_sql(partitioned_dataset_table, if_exists='replace', temporary=(False if model_version == "cli" else True))
 
-    df_with_model = get_df_with_model(partitioned_dataset_table, model_table, model_version)
+    df_with_model = get_df_with_model(partitioned_dataset_table, model_table, model_version,
+                                      challenger_versions=challenger_versions)
 
     features = ["NumTimesPrg", "Age", "PlGlcConc", "BloodP", "SkinThick", "TwoHourSerIns", "BMI", "DiPedFunc"]
 
-    scored_df = df_with_model.map_partition(lambda partition: score_partition(partition, features),
-                                            data_partition_column="partition_id",
-                                            returns=OrderedDict(
-                                                [('PatientId', INTEGER()),
-                                                 ('HasDiabetes', INTEGER())]))
+    returns = OrderedDict([('PatientId', INTEGER()), ('HasDiabetes', INTEGER())] +
+                          [(f'challenger_{i}', INTEGER()) for i in range(1, len(challenger_versions) + 1)])
+
+    scored_df = df_with_model.map_partition(
+        lambda partition: score_partition(partition, features, len(challenger_versions)),
+        data_partition_column="partition_id",
+        returns=returns)
+
+    if challenger_versions:
+        # materialize the single scoring pass, the predictions and the challenger stats are both read from it
+        scored_table = f"shadow_scored_{model_version.split('-')[0]}"
+        scored_df.to_sql(scored_table, if_exists='replace', temporary=True)
+        scored_df = DataFrame(scored_table)
+
+        shadow_report = get_shadow_report(scored_table, model_version, challenger_versions)
+        with open(f"{context.artifact_output_path}/shadow_report.json", "w+") as f:
+            json.dump(shadow_report, f, indent=2)
+
+        for version, report in shadow_report["challengers"].items():
+            print(f"Challenger {version}: disagreement {report['disagreement_rate']:.2%}, lift {report['lift']}")
 
     scored_df = scored_df.assign(job_id=context.job_id, json_report="").select(
         ["job_id", "PatientId", "HasDiabetes", "json_report"])
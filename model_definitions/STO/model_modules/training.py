@@ -11,6 +11,7 @@ from tmo import (
     check_sto_version,
     collect_sto_versions,
     tmo_create_context,
+    execute_sql
 )
 
 import numpy as np
@@ -89,7 +90,17 @@ def train(context: ModelContext, **kwargs):
                                            ('partition_metadata', CLOB()),
                                            ('model_artefact', CLOB())]))
 
-    model_df.to_sql(model_artefacts_table, if_exists="replace")
+    # the table keeps the models of every version (scoring can shadow score older versions), only the rows of the
+    # version being (re)trained are replaced
+    try:
+        execute_sql(f"DELETE FROM {model_artefacts_table} WHERE model_version='{model_version}'")
+    except Exception as e:
+        # only a missing table (3807) is expected, the driver error comes wrapped but keeps its code in the message
+        if "[Error 3807]" not in str(e):
+            raise
+        print(f"Nothing to replace in {model_artefacts_table}, it will be created")
+
+    model_df.to_sql(model_artefacts_table, if_exists="append")
     model_df = DataFrame(
         query=f"SELECT * FROM {model_artefacts_table} WHERE model_version='{model_version}'")
 
@@ -1,9 +1,56 @@
 from teradataml import DataFrame
+from .shadow import challenger_report
 
 def get_df_with_model(data_table: str,
 						 model_artefacts_table: str,
 						 model_version: str,
-						 partition_id: str = "partition_id"):
-	query = f"SELECT d.*, CASE WHEN n_row=1 THEN m.model_artefact ELSE null END AS model FROM (SELECT x.*, ROW_NUMBER() OVER (PARTITION BY x.{partition_id} ORDER BY x.{partition_id}) AS n_row FROM {data_table} x) AS d CROSS JOIN {model_artefacts_table} m WHERE m.model_version = '{model_version}'"
+						 partition_id: str = "partition_id",
+						 challenger_versions: list = ()):
+	# the challengers' artefacts of the same partition are added as model_1, model_2, ... (see score())
+	challenger_columns = "".join(f", CASE WHEN n_row=1 THEN c{i}.model_artefact ELSE null END AS model_{i}"
+								 for i in range(1, len(challenger_versions) + 1))
+	challenger_joins = "".join(f" LEFT JOIN {model_artefacts_table} c{i} ON c{i}.model_version = '{version}' AND c{i}.partition_id = d.{partition_id}"
+							   for i, version in enumerate(challenger_versions, 1))
 
-	return DataFrame.from_query(query)
\ No newline at end of file
+	query = f"SELECT d.*, CASE WHEN n_row=1 THEN m.model_artefact ELSE null END AS model{challenger_columns} FROM (SELECT x.*, ROW_NUMBER() OVER (PARTITION BY x.{partition_id} ORDER BY x.{partition_id}) AS n_row FROM {data_table} x) AS d CROSS JOIN {model_artefacts_table} m{challenger_joins} WHERE m.model_version = '{model_version}'"
+
+	return DataFrame.from_query(query)
+
+
+def check_challengers(model_artefacts_table: str,
+					  challenger_versions: list):
+	# a challenger without partition models would only ever score nulls, fail rather than report nothing
+	if not challenger_versions:
+		return
+	versions = ", ".join(f"'{v}'" for v in challenger_versions)
+	found = DataFrame.from_query(f"""
+		SELECT DISTINCT model_version FROM {model_artefacts_table} WHERE model_version IN ({versions})
+	""").to_pandas().reset_index()["model_version"].tolist()
+
+	missing = [v for v in challenger_versions if v not in found]
+	if missing:
+		raise ValueError(f"Challenger versions {missing} have no models in {model_artefacts_table}, "
+						 f"they must be trained (and kept) before shadow scoring")
+
+
+def get_shadow_report(scored_table: str,
+					  champion_version: str,
+					  challenger_versions: list):
+	# same report as the python-diabetes shadow scoring, the counts are aggregated in-database over the rows the
+	# challenger scored (partitions without a challenger model have null predictions)
+	report = {"champion": champion_version, "challengers": {}}
+	for i, version in enumerate(challenger_versions, 1):
+		counts = DataFrame.from_query(f"""
+			SELECT
+				COUNT(challenger_{i}) AS num_rows,
+				COALESCE(SUM(CASE WHEN challenger_{i} IS NOT NULL THEN HasDiabetes END), 0) AS champion_positives,
+				COALESCE(SUM(challenger_{i}), 0) AS challenger_positives,
+				COALESCE(SUM(CASE WHEN HasDiabetes = 0 AND challenger_{i} = 1 THEN 1 ELSE 0 END), 0) AS zero_to_one,
+				COALESCE(SUM(CASE WHEN HasDiabetes = 1 AND challenger_{i} = 0 THEN 1 ELSE 0 END), 0) AS one_to_zero
+			FROM {scored_table}
+		""").to_pandas().reset_index().iloc[0]
+
+		report["challengers"][version] = challenger_report(
+			*[int(counts[c]) for c in ["num_rows", "champion_positives", "challenger_positives", "zero_to_one",
+									   "one_to_zero"]])
+	return report
@@ -3,6 +3,13 @@ AutoGen Agent Model Modules
 
 This package contains the core components for the AutoGen conversational agent:
 - scoring.py: Main agent implementation with ModelScorer class
+- team_pool.py: Pool of pre-built agent teams for concurrent conversations
+- response_cache.py: LRU / on-disk cache of agent responses
+- llm_client.py: Wrappers of the shared LLM model client (rate limiting)
+- tracing.py: Per-hop latency / token traces of agent conversations
+- llm_replay.py: Record / replay of LLM calls for offline, deterministic runs
+- benchmark.py: Offline load test of the scorer
+- lazy_import.py: Lazy imports of heavy dependencies and an import cost report
 - training.py: Setup and validation module  
 - evaluation.py: Agent performance evaluation
 """
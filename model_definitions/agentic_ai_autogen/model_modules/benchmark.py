@@ -0,0 +1,88 @@
+"""
+Offline load test of the ModelScorer.
+
+Drives the scorer with many concurrent conversations, normally against a replay cassette (LLM_MODE "replay", see
+llm_replay.py) so the LLM latency is known and controlled, and reports throughput, end-to-end latency, the
+orchestration overhead on top of the LLM time, queueing and memory.
+"""
+import asyncio
+import json
+import resource
+import time
+import tracemalloc
+
+from .tracing import percentile
+
+
+async def _drive(scorer, prompts, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(prompt):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await scorer.ainvoke({"message": prompt, "cache": False})
+            return time.perf_counter() - start, str(response).startswith("Error:")
+
+    return await asyncio.gather(*[one(p) for p in prompts])
+
+
+def _llm_time(transport):
+    """Seconds spent in LLM calls so far, None if there's no transport or it doesn't measure them."""
+    if transport is None:
+        return None
+    return transport.stats().get("latency_s_total")
+
+
+def run_benchmark(scorer, prompts, concurrency=64, trace_memory=False, output_path=None):
+    """
+    Run every prompt in `prompts` through `scorer`, `concurrency` at a time, bypassing the response cache.
+
+    The LLM time is taken from the scorer's replay / record transport, the LLM and overhead averages are None
+    without one. Overhead is the end-to-end time of a conversation not spent in LLM calls: agent and team
+    orchestration plus waiting for the scorer's concurrency limit, team pool and rate limiter.
+
+    Memory is always reported as the process max RSS. With `trace_memory` the peak of python allocations is
+    reported as well, tracemalloc slows the run down considerably though so the latencies aren't representative.
+    """
+    transport = getattr(scorer, "llm_transport", None)
+    llm_before = _llm_time(transport)
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    results = asyncio.run(_drive(scorer, prompts, concurrency))
+    wall_time = time.perf_counter() - start
+    peak_memory = None
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+
+    latencies = [r[0] for r in results]
+    llm_after = _llm_time(transport)
+    llm_time = llm_after - llm_before if llm_after is not None else None
+    metrics = scorer.metrics()
+
+    report = {
+        "requests": len(prompts),
+        "concurrency": concurrency,
+        "failures": sum(1 for r in results if r[1]),
+        "wall_time_s": wall_time,
+        "throughput_rps": len(prompts) / wall_time if wall_time else 0.0,
+        "latency_ms_p50": 1000 * percentile(latencies, 0.5),
+        "latency_ms_p95": 1000 * percentile(latencies, 0.95),
+        "latency_ms_p99": 1000 * percentile(latencies, 0.99),
+        "llm_ms_avg": 1000 * llm_time / len(prompts) if llm_time is not None and prompts else None,
+        "overhead_ms_avg": 1000 * (sum(latencies) - llm_time) / len(prompts)
+        if llm_time is not None and prompts else None,
+        "team_pool_wait_ms_p95": metrics["team_pool"]["wait_ms_p95"],
+        "rate_limit_wait_s_total": metrics["rate_limit"]["wait_s_total"] if metrics["rate_limit"] else 0.0,
+        "python_memory_peak_mb": peak_memory,
+        # ru_maxrss is in kilobytes on linux
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+    if output_path:
+        with open(output_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return report
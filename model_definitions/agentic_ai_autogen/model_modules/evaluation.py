@@ -1,13 +1,47 @@
 """
 Evaluation module for autogen agent.
 
-This module provides evaluation capabilities for the conversational agent,
-including response quality metrics and conversation analysis.
+This module provides evaluation capabilities for the conversational agent: a fixed set of prompts is run
+through the ModelScorer concurrently and the latency, conversation length, token usage and failure / timeout
+rates are recorded in metrics.json, so model or prompt changes making the swarm slower or chattier show up when
+comparing model versions.
 """
 
+import asyncio
 import json
+import time
 from tmo import ModelContext
 
+from .scoring import ModelScorer
+from .tracing import percentile
+
+# default prompt set, override with the EVAL_PROMPTS hyperparameter. Keep it fixed between model versions so
+# their metrics are comparable.
+DEFAULT_EVAL_PROMPTS = [
+    "Explain self attention in transformers",
+    "Write a short article on the history of the printing press",
+    "Summarize the trade-offs between SQL and NoSQL databases",
+    "Explain how vaccines train the immune system",
+    "Write a blog post about the benefits of remote work for small teams",
+    "Describe how photosynthesis converts light into chemical energy",
+    "Explain gradient boosting to a software engineer",
+    "Write an article about the causes and effects of inflation"
+]
+
+
+async def _run_prompts(scorer, prompts, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(prompt):
+        async with semaphore:
+            start = time.perf_counter()
+            # bypass the response cache, every prompt must run the full conversation
+            event = await asyncio.wrap_future(scorer._run_on_loop(scorer._afinal(prompt, use_cache=False)))
+            return event, time.perf_counter() - start
+
+    return await asyncio.gather(*[one(p) for p in prompts])
+
+
 def evaluate(context: ModelContext, **kwargs):
     print("Evaluating performance...")
     config = {
@@ -15,6 +49,55 @@ def evaluate(context: ModelContext, **kwargs):
         "LLM_BASE_URL": context.hyperparams["LLM_BASE_URL"],
         "LLM_API_KEY": context.hyperparams["LLM_API_KEY"],
     }
+    # optional runtime settings (concurrency limits etc.) are passed through to the scorer as-is
+    config.update({k: v for k, v in context.hyperparams.items() if k not in config})
 
     with open(f"{context.artifact_output_path}/model_config.json", "w") as f:
         json.dump(config, f)
+
+    prompts = context.hyperparams.get("EVAL_PROMPTS") or DEFAULT_EVAL_PROMPTS
+    repeats = int(context.hyperparams.get("EVAL_REPEATS", 1))
+    prompts = list(prompts) * repeats
+
+    scorer = ModelScorer(config_path=f"{context.artifact_output_path}/model_config.json")
+    try:
+        concurrency = int(context.hyperparams.get("EVAL_CONCURRENCY", scorer.max_concurrency))
+        print(f"Running {len(prompts)} prompts with {concurrency} concurrent conversations")
+        results = asyncio.run(_run_prompts(scorer, prompts, concurrency))
+        traces = [scorer.tracer.conversation(event.get("trace_id")) for event, _ in results]
+        agent_stats = scorer.tracer.stats()["agents"]
+    finally:
+        scorer.close()
+
+    latencies = [1000 * latency for _, latency in results]
+    failures = [event for event, _ in results if event["event"] == "error"]
+    completed = [event for event, _ in results if event["event"] == "final"]
+    traces = [t for t in traces if t is not None]
+    turns = [t["turns"] for t in traces]
+    handoffs = [t["handoffs"] for t in traces]
+    tokens = [t["prompt_tokens"] + t["completion_tokens"] for t in traces]
+
+    evaluation = {
+        "num_prompts": len(prompts),
+        "failure_rate": len(failures) / len(prompts),
+        "timeout_rate": sum(1 for e in completed if e.get("timed_out")) / len(prompts),
+        "budget_exhausted_rate": sum(1 for e in completed if e.get("budget_exhausted")) / len(prompts),
+        "latency_ms_p50": percentile(latencies, 0.5),
+        "latency_ms_p95": percentile(latencies, 0.95),
+        "latency_ms_p99": percentile(latencies, 0.99),
+        "turns_avg": sum(turns) / len(turns) if turns else 0.0,
+        "turns_p95": percentile(turns, 0.95),
+        "handoffs_avg": sum(handoffs) / len(handoffs) if handoffs else 0.0,
+        "handoffs_p95": percentile(handoffs, 0.95),
+        "tokens_per_request_avg": sum(tokens) / len(tokens) if tokens else 0.0,
+        "tokens_per_request_p95": percentile(tokens, 0.95)
+    }
+
+    with open(f"{context.artifact_output_path}/metrics.json", "w+") as f:
+        json.dump(evaluation, f)
+
+    # per agent latency / token percentiles and handoff targets
+    with open(f"{context.artifact_output_path}/agent_metrics.json", "w+") as f:
+        json.dump(agent_stats, f, indent=2)
+
+    print(f"Evaluation: {evaluation}")
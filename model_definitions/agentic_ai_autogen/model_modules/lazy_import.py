@@ -0,0 +1,115 @@
+"""
+Lazy imports of heavy dependencies.
+
+`lazy_import` returns stand-ins for modules (or names in modules) which only import the module the first time they
+are actually used, so e.g. the REST ModelScorer doesn't pay for teradataml / tmo which only batch scoring needs:
+
+    pd = lazy_import("pandas")
+    DataFrame, copy_to_sql = lazy_import("teradataml", "DataFrame", "copy_to_sql")
+
+Stand-ins forward attribute access and calls, so the code using them is unchanged. The time each lazy module took
+to load is kept in `lazy_import_stats`, and `import_cost` breaks down the import time of a module by package.
+"""
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+import types
+from collections import defaultdict
+
+_load_times = {}
+_lock = threading.Lock()
+
+
+def _load(name):
+    # import_module returns straight from sys.modules once the module is loaded
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    if _load_times.get(name) is None:
+        with _lock:
+            if _load_times.get(name) is None:
+                _load_times[name] = time.perf_counter() - start
+    return module
+
+
+class LazyModule(types.ModuleType):
+    """Module stand-in importing `name` on first attribute access."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        _load_times.setdefault(name, None)
+
+    def __getattr__(self, attr):
+        return getattr(_load(self.__name__), attr)
+
+    def __dir__(self):
+        return dir(_load(self.__name__))
+
+
+class LazyAttribute(object):
+    """Stand-in for `module.attr` importing `module` the first time it is called or one of its attributes used."""
+
+    def __init__(self, module, attr):
+        self._module = module
+        self._attr = attr
+        _load_times.setdefault(module, None)
+
+    def _resolve(self):
+        return getattr(_load(self._module), self._attr)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self._resolve(), attr)
+
+    def __repr__(self):
+        return f"<lazy {self._module}.{self._attr}>"
+
+
+def lazy_import(module, *names):
+    """A lazy stand-in for `module`, or for each of `names` in it (a single stand-in for a single name)."""
+    if not names:
+        return LazyModule(module)
+    attributes = tuple(LazyAttribute(module, name) for name in names)
+    return attributes[0] if len(attributes) == 1 else attributes
+
+
+def lazy_import_stats():
+    """Seconds each lazily imported module took to load, None for the ones not used (so not loaded) so far."""
+    with _lock:
+        return dict(_load_times)
+
+
+def import_cost(module, cwd=None, top=20):
+    """
+    Import `module` in a fresh interpreter with -X importtime and return the total import time along with the
+    `top` packages it is spent in, as [(package, milliseconds)] sorted by cost.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=cwd or os.getcwd(), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise ImportError(f"Failed to import {module}: {result.stderr.strip().splitlines()[-1]}")
+
+    packages = defaultdict(float)
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us) / 1000
+        if name.strip() == module:
+            total = int(cumulative_us) / 1000
+
+    return total, sorted(packages.items(), key=lambda p: -p[1])[:top]
+
+
+def print_import_cost(module, cwd=None, top=20):
+    total, packages = import_cost(module, cwd=cwd, top=top)
+    print(f"Importing {module} takes {total:.0f} ms")
+    for package, ms in packages:
+        print(f"  {package:<30} {ms:8.1f} ms")
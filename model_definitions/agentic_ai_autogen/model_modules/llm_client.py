@@ -0,0 +1,146 @@
+"""
+Wrappers around the shared LLM model client.
+
+The agents all call the LLM through a single model client. Wrapping that client lets us add behaviour to every
+LLM call, such as the process-wide rate limiting below, without touching the agents themselves.
+"""
+import asyncio
+import threading
+import time
+
+from autogen_core.models import ChatCompletionClient
+
+
+class DelegatingChatCompletionClient(ChatCompletionClient):
+    """Model client forwarding everything to the wrapped client. Subclasses override what they need."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def create(self, messages, **kwargs):
+        return await self.client.create(messages, **kwargs)
+
+    def create_stream(self, messages, **kwargs):
+        return self.client.create_stream(messages, **kwargs)
+
+    async def close(self):
+        await self.client.close()
+
+    def actual_usage(self):
+        return self.client.actual_usage()
+
+    def total_usage(self):
+        return self.client.total_usage()
+
+    def count_tokens(self, messages, **kwargs):
+        return self.client.count_tokens(messages, **kwargs)
+
+    def remaining_tokens(self, messages, **kwargs):
+        return self.client.remaining_tokens(messages, **kwargs)
+
+    @property
+    def capabilities(self):
+        return self.client.capabilities
+
+    @property
+    def model_info(self):
+        return self.client.model_info
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class TokenBucket(object):
+    """
+    Thread safe token bucket allowing `rate` calls per second with bursts of up to `burst` calls. At most
+    `max_queue` callers may be waiting for a token, further callers are rejected straight away with
+    RateLimitExceeded so the caller can degrade instead of queueing without bound.
+
+    Callers reserve their slot up front (the token count goes negative) and sleep until it is due, so waiters are
+    served in arrival order. It can be shared by model clients running on different event loops.
+    """
+
+    def __init__(self, rate, burst=1, max_queue=100):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_queue = max_queue
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+        self.acquired = 0
+        self.rejected = 0
+        self.wait_time = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        with self._lock:
+            self._refill()
+            if self._tokens < 1 and self._waiting >= self.max_queue:
+                self.rejected += 1
+                raise RateLimitExceeded(f"LLM rate limit queue full ({self.max_queue} waiting)")
+            self._tokens -= 1
+            delay = max(0.0, -self._tokens / self.rate)
+            if delay > 0:
+                self._waiting += 1
+
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                with self._lock:
+                    self._tokens += 1
+                raise
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+
+        with self._lock:
+            self.acquired += 1
+            self.wait_time += delay
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "waiting": self._waiting,
+                "acquired": self.acquired,
+                "rejected": self.rejected,
+                "wait_s_total": self.wait_time
+            }
+
+
+# one bucket per LLM endpoint for the whole process, shared by every scorer calling it
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_token_bucket(key, rate, burst=1, max_queue=100):
+    with _buckets_lock:
+        if key not in _buckets:
+            _buckets[key] = TokenBucket(rate, burst=burst, max_queue=max_queue)
+        return _buckets[key]
+
+
+class RateLimitedChatCompletionClient(DelegatingChatCompletionClient):
+    """Model client taking a token from `bucket` before every LLM call."""
+
+    def __init__(self, client, bucket):
+        super().__init__(client)
+        self.bucket = bucket
+
+    async def create(self, messages, **kwargs):
+        await self.bucket.acquire()
+        return await self.client.create(messages, **kwargs)
+
+    async def create_stream(self, messages, **kwargs):
+        await self.bucket.acquire()
+        async for chunk in self.client.create_stream(messages, **kwargs):
+            yield chunk
@@ -0,0 +1,211 @@
+"""
+Record / replay of LLM calls.
+
+In record mode the shared model client is wrapped so every request / response pair is appended to a JSON lines
+file (a "cassette"). In replay mode the cassette is served by a local stand-in client with configurable artificial
+latency instead of calling the LLM, so the scorer can be load tested and regression tested offline and
+deterministically, measuring our own orchestration overhead independently of the LLM provider.
+
+Requests are matched on the messages sent and the tools offered. Requests that weren't recorded (e.g. new
+prompts in a benchmark) fall back in turn to the responses recorded for the same agent, identified by its system
+message along with its tools (agents can share the same tools, e.g. only the hand-off to the planner), unless the
+replaying client is strict. Cassettes recorded without the agent identity are only replayed for exact matches.
+"""
+import asyncio
+import json
+import hashlib
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+from autogen_core.models import ChatCompletionClient, CreateResult, RequestUsage
+
+from .llm_client import DelegatingChatCompletionClient
+
+REPLAY_MODEL_INFO = {
+    "vision": False,
+    "function_calling": True,
+    "json_output": True,
+    "family": "unknown",
+    "structured_output": True
+}
+
+
+def _tool_names(tools):
+    return sorted(t["name"] if isinstance(t, dict) else t.name for t in tools or [])
+
+
+def request_key(messages, tools=None):
+    payload = json.dumps([[m.model_dump(mode="json") for m in messages], _tool_names(tools)], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def agent_key(messages, tools=None):
+    """The identity of the agent making the request: its system message(s) and the tools it offers."""
+    dumped = [m.model_dump(mode="json") for m in messages]
+    system = [m.get("content") for m in dumped if m.get("type") == "SystemMessage"]
+    payload = json.dumps([system, _tool_names(tools)], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RecordingChatCompletionClient(DelegatingChatCompletionClient):
+    """Model client appending every request / response pair of the wrapped client to the cassette at `path`."""
+
+    def __init__(self, client, path):
+        super().__init__(client)
+        self.path = path
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.latency_total = 0.0
+
+    def _record(self, messages, tools, result, latency):
+        entry = {
+            "key": request_key(messages, tools),
+            "agent": agent_key(messages, tools),
+            "tools": _tool_names(tools),
+            "latency": latency,
+            "response": result.model_dump(mode="json")
+        }
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.recorded += 1
+            self.latency_total += latency
+
+    async def create(self, messages, **kwargs):
+        start = time.perf_counter()
+        result = await self.client.create(messages, **kwargs)
+        self._record(messages, kwargs.get("tools"), result, time.perf_counter() - start)
+        return result
+
+    async def create_stream(self, messages, **kwargs):
+        start = time.perf_counter()
+        async for chunk in self.client.create_stream(messages, **kwargs):
+            if isinstance(chunk, CreateResult):
+                self._record(messages, kwargs.get("tools"), chunk, time.perf_counter() - start)
+            yield chunk
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": "record",
+                "path": self.path,
+                "recorded": self.recorded,
+                "latency_s_total": self.latency_total
+            }
+
+
+class ReplayingChatCompletionClient(ChatCompletionClient):
+    """
+    Stand-in model client serving the responses recorded in the cassette at `path`.
+
+    Each call sleeps for `latency` seconds (the recorded latency of the response when None) plus a uniform random
+    `jitter`, scaled by `latency_scale`. With `strict` set, requests that weren't recorded raise a KeyError instead
+    of falling back to the responses recorded for the same agent.
+    """
+
+    def __init__(self, path, latency=None, jitter=0.0, latency_scale=1.0, strict=False, seed=None):
+        self.path = path
+        self.latency = latency
+        self.jitter = jitter
+        self.latency_scale = latency_scale
+        self.strict = strict
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self._responses = defaultdict(deque)
+        self._by_agent = defaultdict(deque)
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._responses[entry["key"]].append(entry)
+                    if entry.get("agent"):
+                        self._by_agent[entry["agent"]].append(entry)
+
+        self._actual_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        self._total_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        self.calls = 0
+        self.misses = 0
+        self.latency_total = 0.0
+
+    def _next(self, messages, tools):
+        with self._lock:
+            # cycle through the entries so repeated requests keep being served
+            entries = self._responses.get(request_key(messages, tools))
+            if not entries:
+                if self.strict:
+                    raise KeyError("LLM request not found in the replay cassette")
+                self.misses += 1
+                entries = self._by_agent.get(agent_key(messages, tools))
+                if not entries:
+                    raise KeyError(f"No response recorded for the agent (system message and tools "
+                                   f"{_tool_names(tools)}) in the replay cassette")
+            entry = entries[0]
+            entries.rotate(-1)
+
+            latency = entry["latency"] if self.latency is None else self.latency
+            latency = self.latency_scale * (latency + self._random.uniform(0, self.jitter))
+            result = CreateResult.model_validate(entry["response"])
+
+            self.calls += 1
+            self.latency_total += latency
+            self._actual_usage = RequestUsage(
+                prompt_tokens=self._actual_usage.prompt_tokens + result.usage.prompt_tokens,
+                completion_tokens=self._actual_usage.completion_tokens + result.usage.completion_tokens)
+            self._total_usage = self._actual_usage
+            return result, latency
+
+    async def create(self, messages, **kwargs):
+        result, latency = self._next(messages, kwargs.get("tools"))
+        await asyncio.sleep(latency)
+        return result
+
+    async def create_stream(self, messages, **kwargs):
+        result, latency = self._next(messages, kwargs.get("tools"))
+        if not isinstance(result.content, str) or not result.content:
+            await asyncio.sleep(latency)
+            yield result
+            return
+
+        # spread the latency over the chunks like a streaming response
+        chunks = result.content.split(" ")
+        for i, chunk in enumerate(chunks):
+            await asyncio.sleep(latency / len(chunks))
+            yield chunk if i == 0 else " " + chunk
+        yield result
+
+    async def close(self):
+        pass
+
+    def actual_usage(self):
+        return self._actual_usage
+
+    def total_usage(self):
+        return self._total_usage
+
+    def count_tokens(self, messages, **kwargs):
+        # rough estimate, the stand-in has no tokenizer
+        return sum(len(json.dumps(m.model_dump(mode="json"))) for m in messages) // 4
+
+    def remaining_tokens(self, messages, **kwargs):
+        return max(0, 128000 - self.count_tokens(messages, **kwargs))
+
+    @property
+    def capabilities(self):
+        return REPLAY_MODEL_INFO
+
+    @property
+    def model_info(self):
+        return REPLAY_MODEL_INFO
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mode": "replay",
+                "path": self.path,
+                "calls": self.calls,
+                "misses": self.misses,
+                "latency_s_total": self.latency_total
+            }
@@ -0,0 +1,116 @@
+"""
+Response cache for agent conversations.
+
+Responses are keyed on the normalized query together with everything else that determines the answer (the LLM
+model and the agents' system messages), held in an in-memory LRU with a TTL and optionally in a sqlite file so
+they survive restarts.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_query(message):
+    return " ".join(str(message).split()).casefold()
+
+
+def cache_key(message, *context):
+    payload = json.dumps([normalize_query(message)] + list(context))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(object):
+    """
+    LRU cache of at most `size` responses, each valid for `ttl` seconds. With `path` set, entries are also
+    written to a sqlite database which is consulted on an in-memory miss.
+    """
+
+    def __init__(self, size=256, ttl=3600, path=None):
+        self.size = size
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY, response TEXT, latency REAL, created_at REAL
+                )""")
+            self._db.commit()
+
+    def _expired(self, created_at):
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def _get_disk(self, key):
+        row = self._db.execute("SELECT response, latency, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if self._expired(row[2]):
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def _put_memory(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[2]):
+                del self._entries[key]
+                entry = None
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                entry = self._get_disk(key)
+                if entry is not None:
+                    self.disk_hits += 1
+                    self._put_memory(key, entry)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.latency_saved += entry[1]
+            return entry[0]
+
+    def put(self, key, response, latency):
+        entry = (response, latency, time.time())
+        with self._lock:
+            self._put_memory(key, entry)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                                 (key, json.dumps(response), latency, entry[2]))
+                self._db.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "latency_saved_s": self.latency_saved
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
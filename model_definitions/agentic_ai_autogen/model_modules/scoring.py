@@ -5,7 +5,10 @@ This module provides scoring capabilities for the conversational agent.
 """
 import os
 import json
-from tmo import ModelContext
+import asyncio
+import queue
+import threading
+import time
 import warnings
 warnings.filterwarnings('ignore')
 warnings.simplefilter(action='ignore', category=DeprecationWarning)
@@ -13,45 +16,51 @@ warnings.simplefilter(action='ignore', category=UserWarning)
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List
 
 from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.conditions import HandoffTermination, TextMentionTermination
-from autogen_agentchat.messages import HandoffMessage
+from autogen_agentchat.conditions import (
+    HandoffTermination,
+    TextMentionTermination,
+    MaxMessageTermination,
+    TokenUsageTermination,
+    ExternalTermination
+)
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import HandoffMessage, ModelClientStreamingChunkEvent
 from autogen_agentchat.teams import Swarm
-from autogen_ext.models.openai import OpenAIChatCompletionClient
 from autogen_core.models import ModelFamily
 
-class ModelScorer(object):
-    """
-    Model scorer using CrewAI agents for collaborative tasks.
-    """
-    def __init__(self):
-        """Initialize CrewAI agents and tasks based on config."""
+from .lazy_import import lazy_import
+from .llm_client import RateLimitedChatCompletionClient, get_token_bucket
+from .llm_replay import RecordingChatCompletionClient, ReplayingChatCompletionClient
+from .response_cache import ResponseCache, cache_key
+from .team_pool import TeamPool
+from .tracing import TraceRecorder
 
-        with open("artifacts/input/model_config.json", "r") as f:
-            config = json.load(f)
+# batch scoring and the live LLM client only, so the RESTful ModelScorer (or one replaying the LLM) starts without
+# loading them
+pd = lazy_import("pandas")
+DataFrame, copy_to_sql, get_connection = lazy_import("teradataml", "DataFrame", "copy_to_sql", "get_connection")
+ModelContext, tmo_create_context = lazy_import("tmo", "ModelContext", "tmo_create_context")
+OpenAIChatCompletionClient = lazy_import("autogen_ext.models.openai", "OpenAIChatCompletionClient")
 
-        model_client = OpenAIChatCompletionClient(
-            model=config["LLM_MODEL"],
-            base_url=config["LLM_BASE_URL"],
-            api_key=config["LLM_API_KEY"],
-            model_info={
-                "vision": False,
-                "function_calling": True,
-                "json_output": True,
-                "family": ModelFamily.R1,
-                "structured_output": True
-            }
-        )
+# default maximum number of conversations a single worker runs at once
+DEFAULT_MAX_CONCURRENCY = 8
 
-        # Define the agents
-        self.planner = AssistantAgent(
-            "planner",
-            description="An agent for research planning and orchestration.",
-            handoffs=["research_agent", "content_writer_agent"],
-            model_client=model_client,
-            system_message="""
+# default number of prompts read per chunk and responses written per bulk insert in batch scoring
+DEFAULT_BATCH_CHUNK_SIZE = 100
+DEFAULT_BATCH_WRITE_SIZE = 50
+
+# default per-request budgets, so a planner that never says TERMINATE can't loop forever
+DEFAULT_MAX_TURNS = 20
+DEFAULT_MAX_SECONDS = 300
+
+# the response when the conversation produced no text output, never cached
+NO_FINAL_OUTPUT = "No final output found"
+
+PLANNER_SYSTEM_MESSAGE = """
             You are a Research and Content Writer Coordinator. Coordinate research and writing by delegating to specialized agents:
             - research_agent: An agent for conducting research and analysis
             - content_writer_agent: An agent for writing content based on research.
@@ -60,41 +69,295 @@ class ModelScorer(object):
             Always handoff to a single agent at a time.
             Use TERMINATE when research and writing content is complete.
             """
-        )
-        self.research_agent = AssistantAgent(
-            "research_agent",
-            description="An agent for conducting research and analysis.",
-            handoffs=["planner"],
-            model_client=model_client,
-            system_message="""
+
+RESEARCH_AGENT_SYSTEM_MESSAGE = """
             You are a Senior Research Analyst. Your goal is to discover new insights.
             You're an expert at finding interesting information across various domains.
             Always provide well-researched, factual information with clear explanations.
             Focus on delivering comprehensive analysis and interesting insights.
             Always handoff back to planner when research is complete.
-            """,
-        )
+            """
 
-        self.content_writer_agent = AssistantAgent(
-            "content_writer_agent",
-            description="An agent for writing the content.",
-            handoffs=["planner"],
-            model_client=model_client,
-            system_message="""
+CONTENT_WRITER_SYSTEM_MESSAGE = """
             You are a Content Writer. Your goal is to write engaging content.
             You're a talented writer who simplifies complex information into clear, concise content.
             Take research findings and transform them into readable, engaging blog posts or articles.
             Focus on clarity, engagement, and making complex topics accessible.
             Always handoff back to planner when content writing is complete.
-            """,
+            """
+
+
+def event_to_dict(item):
+    """Convert an agent message / event from the team stream into a json serializable streaming event."""
+    if isinstance(item, ModelClientStreamingChunkEvent):
+        return {"event": "content", "source": item.source, "delta": item.content}
+
+    content = item.to_text() if hasattr(item, "to_text") else str(getattr(item, "content", ""))
+    return {
+        "event": "agent",
+        "source": getattr(item, "source", None),
+        "type": getattr(item, "type", type(item).__name__),
+        "content": content,
+        "target": getattr(item, "target", None)
+    }
+
+
+def _read_completed(table, entity_key, job_id):
+    # rows already written for this job, i.e. the checkpoint of a job being resumed
+    try:
+        done = DataFrame.from_query(f"SELECT {entity_key} FROM {table} WHERE job_id = '{job_id}'")
+        return set(done.to_pandas(all_rows=True).reset_index()[entity_key].tolist())
+    except Exception:
+        # the predictions table doesn't exist yet
+        return set()
+
+
+async def _score_batch(scorer, chunks, write, concurrency, write_size):
+    """
+    Run the (key, prompt) pairs of `chunks` through the scorer, at most `concurrency` conversations at once, and
+    pass the successful results to `write` in batches of `write_size`. Reading the next chunk and writing happen
+    off the event loop so conversations keep running meanwhile, on a single database thread as they share the
+    teradataml connection.
+    """
+    loop = asyncio.get_running_loop()
+    database = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-database")
+    semaphore = asyncio.Semaphore(concurrency)
+    write_lock = asyncio.Lock()
+    completed, pending = [], set()
+    counts = {"scored": 0, "failed": 0}
+
+    async def flush(min_rows):
+        async with write_lock:
+            if len(completed) >= max(min_rows, 1):
+                rows = completed[:]
+                completed.clear()
+                await loop.run_in_executor(database, write, rows)
+
+    async def one(key, prompt):
+        try:
+            event = await asyncio.wrap_future(scorer._run_on_loop(scorer._afinal(prompt)))
+            if event["event"] == "final":
+                completed.append((key, event))
+                counts["scored"] += 1
+            else:
+                # failed rows aren't written, so a resumed job retries them
+                counts["failed"] += 1
+            await flush(write_size)
+        finally:
+            semaphore.release()
+
+    try:
+        iterator = iter(chunks)
+        while True:
+            chunk = await loop.run_in_executor(database, next, iterator, None)
+            if chunk is None:
+                break
+            for key, prompt in chunk:
+                await semaphore.acquire()
+                task = asyncio.create_task(one(key, prompt))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+        await asyncio.gather(*list(pending))
+        await flush(1)
+    finally:
+        database.shutdown(wait=True)
+    return counts
+
+
+def score(context: ModelContext, **kwargs):
+    """
+    Batch score the prompts of the dataset. Prompts are read in chunks of BATCH_CHUNK_SIZE and run through the
+    agents BATCH_CONCURRENCY at a time (default MAX_CONCURRENCY), the responses are appended to the predictions
+    table in bulk every BATCH_WRITE_SIZE rows.
+
+    The predictions table is the checkpoint: rows already written for the job are skipped, so a crashed job can
+    be resumed by scoring again with RESUME_JOB_ID set to the id of the crashed job.
+    """
+
+    tmo_create_context()
+
+    hyperparams = context.hyperparams or {}
+    entity_key = context.dataset_info.entity_key
+    target_name = context.dataset_info.target_names[0]
+    prompt_column = hyperparams.get("BATCH_PROMPT_COLUMN", context.dataset_info.feature_names[0])
+    chunk_size = int(hyperparams.get("BATCH_CHUNK_SIZE", DEFAULT_BATCH_CHUNK_SIZE))
+    write_size = int(hyperparams.get("BATCH_WRITE_SIZE", DEFAULT_BATCH_WRITE_SIZE))
+    job_id = hyperparams.get("RESUME_JOB_ID") or context.job_id
+
+    predictions_table = context.dataset_info.predictions_table
+    if context.dataset_info.predictions_database:
+        predictions_table = f"{context.dataset_info.predictions_database}.{predictions_table}"
+
+    completed = _read_completed(predictions_table, entity_key, job_id)
+    if completed:
+        print(f"Resuming job {job_id}, skipping {len(completed)} rows already scored")
+
+    def chunks():
+        for chunk in pd.read_sql(context.dataset_info.sql, get_connection(), chunksize=chunk_size):
+            yield [(k, p) for k, p in zip(chunk[entity_key].tolist(), chunk[prompt_column].tolist())
+                   if k not in completed]
+
+    def write(rows):
+        # same table schema as the other model definitions' predictions tables
+        predictions_pdf = pd.DataFrame({
+            "job_id": job_id,
+            entity_key: [key for key, _ in rows],
+            target_name: [event["content"] for _, event in rows],
+            "json_report": [json.dumps({k: v for k, v in event.items() if k not in ("event", "content")})
+                            for _, event in rows]
+        })
+        copy_to_sql(df=predictions_pdf,
+                    schema_name=context.dataset_info.predictions_database,
+                    table_name=context.dataset_info.predictions_table,
+                    index=False,
+                    if_exists="append")
+
+    scorer = ModelScorer(config_path=f"{context.artifact_input_path}/model_config.json")
+    try:
+        concurrency = int(hyperparams.get("BATCH_CONCURRENCY", scorer.max_concurrency))
+        print(f"Scoring with {concurrency} concurrent conversations")
+        start = time.perf_counter()
+        counts = asyncio.run(_score_batch(scorer, chunks(), write, concurrency, write_size))
+        elapsed = time.perf_counter() - start
+    finally:
+        scorer.close()
+
+    print(f"Finished scoring {counts['scored']} prompts in {elapsed:.1f}s, {counts['failed']} failed")
+    if counts["failed"]:
+        print(f"Score again with RESUME_JOB_ID={job_id} to retry the failed prompts")
+
+
+# Add code required for RESTful API
+class ModelScorer(object):
+    """
+    Model scorer using CrewAI agents for collaborative tasks.
+
+    Conversations run on a persistent event loop owned by the scorer. `ainvoke` is the native coroutine API and
+    `invoke` a thin sync wrapper around it, so many requests can be in flight at once up to MAX_CONCURRENCY.
+    """
+    def __init__(self, config_path="artifacts/input/model_config.json"):
+        """Initialize CrewAI agents and tasks based on config."""
+
+        with open(config_path, "r") as f:
+            config = json.load(f)
+
+        # LLM_MODE "record" captures the LLM calls to LLM_CASSETTE, "replay" serves them from it without the LLM
+        llm_mode = config.get("LLM_MODE", "live")
+        if llm_mode not in ("live", "record", "replay"):
+            raise ValueError(f"Unsupported LLM_MODE {llm_mode}, expected live, record or replay")
+
+        if llm_mode == "replay":
+            self.model_client = ReplayingChatCompletionClient(
+                config["LLM_CASSETTE"],
+                latency=float(config["REPLAY_LATENCY"]) if config.get("REPLAY_LATENCY") is not None else None,
+                jitter=float(config.get("REPLAY_JITTER", 0)),
+                latency_scale=float(config.get("REPLAY_LATENCY_SCALE", 1)),
+                strict=bool(config.get("REPLAY_STRICT", False)),
+                seed=config.get("REPLAY_SEED"))
+        else:
+            self.model_client = OpenAIChatCompletionClient(
+                model=config["LLM_MODEL"],
+                base_url=config["LLM_BASE_URL"],
+                api_key=config["LLM_API_KEY"],
+                model_info={
+                    "vision": False,
+                    "function_calling": True,
+                    "json_output": True,
+                    "family": ModelFamily.R1,
+                    "structured_output": True
+                }
+            )
+            if llm_mode == "record":
+                self.model_client = RecordingChatCompletionClient(self.model_client, config["LLM_CASSETTE"])
+        self.llm_transport = self.model_client if llm_mode != "live" else None
+
+        # process-wide rate limit of the LLM calls made to this endpoint
+        self.rate_limiter = None
+        if float(config.get("RATE_LIMIT_RPS", 0)) > 0:
+            rate = float(config["RATE_LIMIT_RPS"])
+            self.rate_limiter = get_token_bucket(config["LLM_BASE_URL"], rate,
+                                                 burst=float(config.get("RATE_LIMIT_BURST", max(1.0, rate))),
+                                                 max_queue=int(config.get("RATE_LIMIT_MAX_QUEUE", 100)))
+            self.model_client = RateLimitedChatCompletionClient(self.model_client, self.rate_limiter)
+
+        # per-request budgets, the run ends gracefully with the best output so far when one is exhausted
+        self.max_turns = int(config.get("MAX_TURNS", DEFAULT_MAX_TURNS))
+        self.max_tokens = int(config["MAX_TOKENS"]) if config.get("MAX_TOKENS") else None
+        self.max_seconds = float(config.get("MAX_SECONDS", DEFAULT_MAX_SECONDS))
+
+        self.max_concurrency = int(config.get("MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY))
+        self.team_pool_size = int(config.get("TEAM_POOL_SIZE", self.max_concurrency))
+
+        # cache of final responses, keyed on the query and everything else that determines the response
+        self.cache = None
+        if int(config.get("CACHE_SIZE", 256)) > 0:
+            self.cache = ResponseCache(size=int(config.get("CACHE_SIZE", 256)),
+                                       ttl=float(config.get("CACHE_TTL", 3600)),
+                                       path=config.get("CACHE_PATH"))
+        self._cache_context = [config["LLM_MODEL"], PLANNER_SYSTEM_MESSAGE,
+                               RESEARCH_AGENT_SYSTEM_MESSAGE, CONTENT_WRITER_SYSTEM_MESSAGE]
+
+        # per-hop latency / token traces of the conversations, optionally exported as JSON lines
+        self.tracer = TraceRecorder(path=config.get("TRACE_PATH"), window=int(config.get("TRACE_WINDOW", 1000)))
+
+        # persistent event loop all conversations run on
+        self.loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self.loop.run_forever, name="agent-event-loop", daemon=True)
+        self._loop_thread.start()
+        self._run_on_loop(self._init_on_loop()).result()
+
+    async def _init_on_loop(self):
+        # created on the scorer loop so they are bound to it on all python versions
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.team_pool = TeamPool(self.create_team, self.team_pool_size)
+
+    def _run_on_loop(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def create_team(self):
+        """Build a Swarm with its own agents (and message history) sharing the scorer's model client. Teams are
+        pre-built into the scorer's team pool."""
+
+        # Define the agents
+        planner = AssistantAgent(
+            "planner",
+            description="An agent for research planning and orchestration.",
+            handoffs=["research_agent", "content_writer_agent"],
+            model_client=self.model_client,
+            system_message=PLANNER_SYSTEM_MESSAGE
+        )
+        research_agent = AssistantAgent(
+            "research_agent",
+            description="An agent for conducting research and analysis.",
+            handoffs=["planner"],
+            model_client=self.model_client,
+            system_message=RESEARCH_AGENT_SYSTEM_MESSAGE,
         )
 
-        # Define termination condition
-        termination = TextMentionTermination("TERMINATE")
+        content_writer_agent = AssistantAgent(
+            "content_writer_agent",
+            description="An agent for writing the content.",
+            handoffs=["planner"],
+            model_client=self.model_client,
+            # stream the writer's tokens so streaming clients receive the content as it is generated
+            model_client_stream=True,
+            system_message=CONTENT_WRITER_SYSTEM_MESSAGE,
+        )
+
+        # Define termination condition, the planner saying TERMINATE or any of the budgets running out.
+        # The wall-clock budget is enforced through the external termination (see _astream) since a time based
+        # condition would start counting when the team is built / reset, not when the request starts.
+        wall_clock = ExternalTermination()
+        termination = TextMentionTermination("TERMINATE") | MaxMessageTermination(self.max_turns) | wall_clock
+        if self.max_tokens:
+            termination = termination | TokenUsageTermination(max_total_token=self.max_tokens)
 
-        self.research_team = Swarm(
-            participants=[self.planner, self.research_agent, self.content_writer_agent], termination_condition=termination
+        team = Swarm(
+            participants=[planner, research_agent, content_writer_agent], termination_condition=termination
         )
+        team.wall_clock_termination = wall_clock
+        return team
     
     # Extract only the final output content
     def get_final_output(self, response):
@@ -111,7 +374,164 @@ class ModelScorer(object):
             content = content.split("**[Handing off to")[0].strip()
             return content
         else:
-            return "No final output found"
+            return NO_FINAL_OUTPUT
+
+    def get_best_output(self, result):
+        """The final output, or when the run was cut short by a budget, the most complete output so far"""
+        if "TERMINATE" in (result.stop_reason or ""):
+            return self.get_final_output(result)
+
+        for source in ["content_writer_agent", "research_agent"]:
+            messages = [msg for msg in result.messages
+                        if getattr(msg, "source", None) == source and getattr(msg, "type", None) == "TextMessage"]
+            if messages:
+                return messages[-1].content.split("**[Handing off to")[0].strip()
+
+        return self.get_final_output(result)
+
+    async def _astream(self, query, use_cache=True):
+        key = cache_key(query, *self._cache_context) if self.cache is not None else None
+        if key is not None and use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield dict(cached, cached=True)
+                return
+
+        async with self._semaphore:
+            start = time.perf_counter()
+            trace = None
+            try:
+                async with self.team_pool.team() as team:
+                    trace = self.tracer.start(query)
+                    deadline = {"reached": False}
+
+                    def on_deadline():
+                        deadline["reached"] = True
+                        team.wall_clock_termination.set()
+
+                    timer = self.loop.call_later(self.max_seconds, on_deadline)
+                    try:
+                        async for item in team.run_stream(task=query):
+                            if isinstance(item, TaskResult):
+                                budget_exhausted = "TERMINATE" not in (item.stop_reason or "")
+                                trace.finish("budget_exhausted" if budget_exhausted else "ok", item.stop_reason)
+                                final = {
+                                    "event": "final",
+                                    "content": str(self.get_best_output(item)),
+                                    "agent_count": len(item.messages),
+                                    "stop_reason": item.stop_reason,
+                                    "budget_exhausted": budget_exhausted,
+                                    "timed_out": deadline["reached"],
+                                    "trace_id": trace.trace_id
+                                }
+                                # responses cut short by a budget, or without output, aren't cached
+                                if key is not None and not budget_exhausted and final["content"] != NO_FINAL_OUTPUT:
+                                    self.cache.put(key, final, time.perf_counter() - start)
+                                yield final
+                            else:
+                                trace.observe(item)
+                                yield event_to_dict(item)
+                    finally:
+                        timer.cancel()
+            except Exception as e:
+                print(f"Agent failed, returning without agent/LLM call: {str(e)}")
+                if trace is not None:
+                    trace.finish("error", str(e))
+                yield {"event": "error", "content": "Error: Agent failed - " + str(e)}
+            finally:
+                if trace is not None:
+                    if trace.end_ns is None:
+                        # the consumer went away before the conversation completed
+                        trace.finish("cancelled")
+                    self.tracer.record(trace)
+
+    async def _afinal(self, query, use_cache=True):
+        # the final (or error) event of a conversation
+        result = {"event": "final", "content": NO_FINAL_OUTPUT}
+        async for event in self._astream(query, use_cache):
+            if event["event"] in ("final", "error"):
+                result = event
+        return result
+
+    async def _ainvoke(self, query, use_cache=True):
+        return (await self._afinal(query, use_cache))["content"]
+
+    def _pump(self, agen, put, done):
+        # drain an async generator on the scorer loop, handing each item to `put`
+        async def pump():
+            try:
+                async for item in agen:
+                    put(item)
+            finally:
+                put(done)
+        return self._run_on_loop(pump())
+
+    async def astream(self, query):
+        """
+        Stream this application as an async generator of events, as they happen:
+
+        - {"event": "agent", "source", "type", "content", "target"} for each agent message / handoff
+        - {"event": "content", "source", "delta"} for each chunk of content generated by the writer
+        - {"event": "final", "content", "agent_count", "stop_reason", "budget_exhausted", "timed_out", "trace_id"}
+          once the conversation is complete (only this event, with "cached": true, when the response comes from the cache)
+        - {"event": "error", "content"} if the conversation failed
+
+        Can be consumed from any event loop, the conversation itself always runs on the scorer's loop.
+        """
+        agen = self._astream(query["message"], query.get("cache", True))
+        caller_loop = asyncio.get_running_loop()
+        if caller_loop is self.loop:
+            async for event in agen:
+                yield event
+            return
+
+        events, done = asyncio.Queue(), object()
+        future = self._pump(agen, lambda item: caller_loop.call_soon_threadsafe(events.put_nowait, item), done)
+        try:
+            while True:
+                event = await events.get()
+                if event is done:
+                    break
+                yield event
+        finally:
+            # stop the conversation if the consumer goes away early
+            future.cancel()
+
+    def stream(self, query):
+        """Sync generator over the same events as `astream`, e.g. for chunked HTTP responses."""
+        events, done = queue.Queue(), object()
+        future = self._pump(self._astream(query["message"], query.get("cache", True)), events.put, done)
+        try:
+            while True:
+                event = events.get()
+                if event is done:
+                    break
+                yield event
+        finally:
+            future.cancel()
+
+    def stream_sse(self, query):
+        """The `stream` events formatted as Server-Sent Events."""
+        for event in self.stream(query):
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+    async def ainvoke(self, query):
+        """
+        Invoke this application using the Autogen agent, as a coroutine.
+
+        The conversation always runs on the scorer's event loop, so this can be awaited from any loop.
+
+        Args:
+            query: dict with the input message under "message", and optionally "cache": False to bypass the
+                response cache
+
+        Returns:
+            json response
+        """
+        coro = self._ainvoke(query["message"], query.get("cache", True))
+        if asyncio.get_running_loop() is self.loop:
+            return await coro
+        return await asyncio.wrap_future(self._run_on_loop(coro))
 
     def invoke(self, query):
         """
@@ -123,28 +543,22 @@ class ModelScorer(object):
         Returns:
             json response
         """
-        query=query["message"]
-        import asyncio
-        async def _collect_async(agen):
-            return [item async for item in agen]
-
-        def sync_list(gen):
-            if hasattr(gen, "__aiter__"):
-                return asyncio.run(_collect_async(gen))
-            else:
-                return list(gen)
+        return self._run_on_loop(self._ainvoke(query["message"], query.get("cache", True))).result()
 
-        try:
-            result_stream = self.research_team.run_stream(task=query)
-            result_list = sync_list(result_stream)
-            class Response:
-                def __init__(self, messages):
-                    self.messages = messages
-            result = Response(result_list)
-            response = str(self.get_final_output(result))
-        except Exception as e:
-            print(f"Agent failed, returning without agent/LLM call: {str(e)}")
-            response = "Error: Agent failed - " + str(e)
-
-        return response
+    def metrics(self):
+        """Runtime metrics of the scorer."""
+        return {
+            "team_pool": self.team_pool.stats(),
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "rate_limit": self.rate_limiter.stats() if self.rate_limiter is not None else None,
+            "traces": self.tracer.stats(),
+            "llm_transport": self.llm_transport.stats() if self.llm_transport is not None else None
+        }
 
+    def close(self):
+        """Close the model client and stop the scorer's event loop."""
+        self._run_on_loop(self.model_client.close()).result()
+        if self.cache is not None:
+            self.cache.close()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._loop_thread.join()
@@ -0,0 +1,66 @@
+"""
+Pool of pre-built agent teams.
+
+Each conversation checks out a team for its exclusive use, so agent message history is never shared between
+concurrent requests, and the team is reset before it goes back into the pool. Teams are built once up front
+(they all share the scorer's model client) and the pool size bounds how many conversations run at once.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class TeamPool(object):
+    """
+    Bounded pool of teams built by `factory`. Must be created and used on the scorer's event loop.
+    """
+
+    def __init__(self, factory, size):
+        self.factory = factory
+        self.size = size
+        self._queue = asyncio.Queue(maxsize=size)
+        for _ in range(size):
+            self._queue.put_nowait(factory())
+
+        self.acquired = 0
+        self.replaced = 0
+        self._wait_times = deque(maxlen=1000)
+
+    async def acquire(self):
+        start = time.perf_counter()
+        team = await self._queue.get()
+        self._wait_times.append(time.perf_counter() - start)
+        self.acquired += 1
+        return team
+
+    async def release(self, team):
+        try:
+            await team.reset()
+        except Exception as e:
+            # e.g. the run was cancelled mid-way and the team can't be reset, replace it with a fresh one
+            print(f"Replacing team that failed to reset: {str(e)}")
+            team = self.factory()
+            self.replaced += 1
+        self._queue.put_nowait(team)
+
+    @asynccontextmanager
+    async def team(self):
+        team = await self.acquire()
+        try:
+            yield team
+        finally:
+            await self.release(team)
+
+    def stats(self):
+        waits = sorted(self._wait_times)
+        return {
+            "size": self.size,
+            "available": self._queue.qsize(),
+            "in_use": self.size - self._queue.qsize(),
+            "acquired": self.acquired,
+            "replaced": self.replaced,
+            "wait_ms_avg": 1000 * sum(waits) / len(waits) if waits else 0.0,
+            "wait_ms_p95": 1000 * waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+            "wait_ms_max": 1000 * waits[-1] if waits else 0.0
+        }
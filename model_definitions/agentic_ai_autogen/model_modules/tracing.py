@@ -0,0 +1,184 @@
+"""
+Per-hop tracing of agent conversations.
+
+Every LLM turn of a conversation is recorded as a span with the agent name, the turn latency, prompt and
+completion tokens and the agent it handed off to. Spans follow the OpenTelemetry span data model (trace/span ids,
+start/end times in unix nanoseconds and attributes) and are exported as JSON lines, one conversation per line.
+The recorder also keeps recent turns per agent to report latency and token percentiles.
+"""
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict, deque
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return float(values[min(len(values) - 1, int(round(q * (len(values) - 1))))])
+
+
+def _now_ns():
+    return time.time_ns()
+
+
+class ConversationTrace(object):
+    """Spans of a single conversation, built from the messages / events of the team stream as they arrive."""
+
+    def __init__(self, query):
+        self.trace_id = uuid.uuid4().hex
+        self.query = query
+        self.start_ns = _now_ns()
+        self.end_ns = None
+        self.turns = []
+        self.status = "ok"
+        self.stop_reason = None
+        self._turn_start_ns = self.start_ns
+
+    def _span(self, name, start_ns, end_ns, attributes):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": uuid.uuid4().hex[:16],
+            "name": name,
+            "start_time_unix_nano": start_ns,
+            "end_time_unix_nano": end_ns,
+            "attributes": attributes
+        }
+
+    def observe(self, item):
+        source = getattr(item, "source", None)
+        now = _now_ns()
+        if type(item).__name__ == "ModelClientStreamingChunkEvent":
+            # chunks arrive while the LLM call is still in progress
+            return
+
+        # a message carrying usage is the outcome of an LLM call and ends the agent's turn, anything else (the
+        # task, tool executions, handoffs) happens between LLM calls and the next turn starts after it
+        usage = getattr(item, "models_usage", None)
+        if usage is not None and source not in (None, "user"):
+            self.turns.append(self._span(f"agent_turn {source}", self._turn_start_ns, now, {
+                "agent.name": source,
+                "agent.message_type": getattr(item, "type", type(item).__name__),
+                "llm.latency_ms": (now - self._turn_start_ns) / 1e6,
+                "llm.prompt_tokens": usage.prompt_tokens,
+                "llm.completion_tokens": usage.completion_tokens,
+                "agent.handoff_target": None
+            }))
+        self._turn_start_ns = now
+
+        target = getattr(item, "target", None)
+        if target is not None:
+            for turn in reversed(self.turns):
+                if turn["attributes"]["agent.name"] == source:
+                    turn["attributes"]["agent.handoff_target"] = target
+                    break
+
+    def finish(self, status="ok", stop_reason=None):
+        self.end_ns = _now_ns()
+        self.status = status
+        self.stop_reason = stop_reason
+        return self
+
+    @property
+    def handoffs(self):
+        return sum(1 for t in self.turns if t["attributes"]["agent.handoff_target"] is not None)
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or _now_ns()) - self.start_ns) / 1e6
+
+    def summary(self):
+        return {
+            "trace_id": self.trace_id,
+            "status": self.status,
+            "stop_reason": self.stop_reason,
+            "duration_ms": self.duration_ms,
+            "turns": len(self.turns),
+            "handoffs": self.handoffs,
+            "prompt_tokens": sum(t["attributes"]["llm.prompt_tokens"] for t in self.turns),
+            "completion_tokens": sum(t["attributes"]["llm.completion_tokens"] for t in self.turns)
+        }
+
+    def to_dict(self):
+        summary = self.summary()
+        root = self._span("conversation", self.start_ns, self.end_ns, {
+            "conversation.query": self.query,
+            "conversation.status": self.status,
+            "conversation.stop_reason": self.stop_reason,
+            "conversation.turns": summary["turns"],
+            "conversation.handoffs": summary["handoffs"],
+            "conversation.duration_ms": summary["duration_ms"],
+            "llm.prompt_tokens": summary["prompt_tokens"],
+            "llm.completion_tokens": summary["completion_tokens"]
+        })
+        for turn in self.turns:
+            turn["parent_span_id"] = root["span_id"]
+        return {"trace_id": self.trace_id, "spans": [root] + self.turns}
+
+
+class TraceRecorder(object):
+    """
+    Collects finished conversation traces, appends them to `path` as JSON lines (if set) and aggregates the
+    most recent `window` turns per agent and conversations.
+    """
+
+    def __init__(self, path=None, window=1000):
+        self.path = path
+        self._lock = threading.Lock()
+        self._turns = defaultdict(lambda: deque(maxlen=window))
+        self._conversations = OrderedDict()
+        self.window = window
+
+    def start(self, query):
+        return ConversationTrace(query)
+
+    def record(self, trace):
+        with self._lock:
+            for turn in trace.turns:
+                self._turns[turn["attributes"]["agent.name"]].append(turn["attributes"])
+            self._conversations[trace.trace_id] = trace.summary()
+            while len(self._conversations) > self.window:
+                self._conversations.popitem(last=False)
+
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(trace.to_dict()) + "\n")
+
+    def conversation(self, trace_id):
+        """Summary of a recent conversation (duration, turns, handoffs, tokens) by trace id."""
+        with self._lock:
+            return self._conversations.get(trace_id)
+
+    def stats(self):
+        with self._lock:
+            agents = {}
+            for agent, turns in self._turns.items():
+                latencies = [t["llm.latency_ms"] for t in turns]
+                agents[agent] = {
+                    "turns": len(turns),
+                    "latency_ms_p50": percentile(latencies, 0.5),
+                    "latency_ms_p95": percentile(latencies, 0.95),
+                    "prompt_tokens_p50": percentile([t["llm.prompt_tokens"] for t in turns], 0.5),
+                    "completion_tokens_p50": percentile([t["llm.completion_tokens"] for t in turns], 0.5),
+                    "handoffs": dict(_count(t["agent.handoff_target"] for t in turns if t["agent.handoff_target"]))
+                }
+
+            conversations = list(self._conversations.values())
+            durations = [c["duration_ms"] for c in conversations]
+            return {
+                "conversations": len(conversations),
+                "latency_ms_p50": percentile(durations, 0.5),
+                "latency_ms_p95": percentile(durations, 0.95),
+                "turns_avg": sum(c["turns"] for c in conversations) / len(durations) if durations else 0.0,
+                "handoffs_avg": sum(c["handoffs"] for c in conversations) / len(durations) if durations else 0.0,
+                "agents": agents
+            }
+
+
+def _count(values):
+    counts = defaultdict(int)
+    for value in values:
+        counts[value] += 1
+    return counts
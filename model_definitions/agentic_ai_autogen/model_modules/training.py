@@ -20,6 +20,8 @@ def train(context: ModelContext, **kwargs):
          "LLM_BASE_URL": context.hyperparams["LLM_BASE_URL"],
          "LLM_API_KEY": context.hyperparams["LLM_API_KEY"],
       }
+   # optional runtime settings (concurrency limits etc.) are passed through to the scorer as-is
+   config.update({k: v for k, v in context.hyperparams.items() if k not in config})
 
    with open(f"{context.artifact_output_path}/model_config.json", "w") as f:
       json.dump(config, f)
@@ -1,4 +1,3 @@
-from sklearn.metrics import confusion_matrix
 from teradataml import (
     DataFrame,
     copy_to_sql,
@@ -14,10 +13,9 @@ from tmo import (
     ModelContext
 )
 from collections import Counter
+from .plot_service import PlotService
 
-import matplotlib.pyplot as plt
 import json
-import pandas as pd
 import os
 
 def traverse_tree(tree, feature_counter):
@@ -40,47 +38,6 @@ def compute_feature_importance(trees_json):
     return feature_importance
 
 
-def plot_feature_importance(fi, img_filename):
-    feat_importances = pd.Series(fi)
-    feat_importances.nlargest(10).plot(
-        kind='barh').set_title('Feature Importance')
-    fig = plt.gcf()
-    fig.savefig(img_filename, dpi=500)
-    plt.clf()
-
-
-def plot_confusion_matrix(cf, img_filename):
-    fig, ax = plt.subplots(figsize=(7.5, 7.5))
-    ax.matshow(cf, cmap=plt.cm.Blues, alpha=0.3)
-    for i in range(cf.shape[0]):
-        for j in range(cf.shape[1]):
-            ax.text(x=j, y=i, s=cf[i, j], va='center',
-                    ha='center', size='xx-large')
-    ax.set_xlabel('Predicted labels')
-    ax.set_ylabel('True labels')
-    ax.set_title('Confusion Matrix')
-    fig = plt.gcf()
-    fig.savefig(img_filename, dpi=500)
-    plt.clf()
-
-
-def plot_roc_curve(roc_out, img_filename):
-    auc = roc_out.result.to_pandas().reset_index()['AUC'][0]
-    roc_results = roc_out.output_data.to_pandas()
-    plt.plot(roc_results['fpr'], roc_results['tpr'],
-             color='darkorange', lw=2, label='ROC curve (AUC = %0.2f)' % 0.27)
-    plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--')
-    plt.xlim([0.0, 1.0])
-    plt.ylim([0.0, 1.05])
-    plt.xlabel('False Positive Rate')
-    plt.ylabel('True Positive Rate')
-    plt.title('Receiver Operating Characteristic (ROC) Curve')
-    plt.legend(loc="lower right")
-    fig = plt.gcf()
-    fig.savefig(img_filename, dpi=500)
-    plt.clf()
-
-
 def evaluate(context: ModelContext, **kwargs):
 
     tmo_create_context()
@@ -88,6 +45,13 @@ def evaluate(context: ModelContext, **kwargs):
     print(f"Loading model from table model_{context.model_version}")
     model = DataFrame(f"model_{context.model_version}")
 
+    # the plots render in background processes while the evaluation continues, see plot_service.py
+    hyperparams = context.hyperparams or {}
+    plots = PlotService(context.artifact_output_path,
+                        dpi=int(hyperparams.get("plot_dpi", 500)),
+                        format=hyperparams.get("plot_format", "png"),
+                        workers=int(hyperparams.get("plot_workers", 2)))
+
     target_name = context.dataset_info.target_names[0]
     entity_key = context.dataset_info.entity_key
 
@@ -147,45 +111,60 @@ def evaluate(context: ModelContext, **kwargs):
     with open(f"{context.artifact_output_path}/metrics.json", "w+") as f:
         json.dump(evaluation, f)
 
-    cm = confusion_matrix(predicted_data.result.to_pandas()[
-                          'HasDiabetes'], predicted_data.result.to_pandas()['Prediction'])
-
-    plot_confusion_matrix(
-        cm, f"{context.artifact_output_path}/confusion_matrix")
-
-    roc_out = ROC(
-        data=predictions.result,
-        probability_column='Prob_1',
-        observation_column=target_name,
-        positive_class='1',
-        num_thresholds=1000
-    )
-
-    plot_roc_curve(roc_out, f"{context.artifact_output_path}/roc_curve")
-
-    # Calculate feature importance and generate plot
-    try:
-        model_pdf = model.result.to_pandas()['classification_tree']
-        feature_importance = compute_feature_importance(model_pdf)
-        feature_importance_df = pd.DataFrame(
-            list(feature_importance.items()), columns=['Feature', 'Importance'])
-        plot_feature_importance(
-            feature_importance, f"{context.artifact_output_path}/feature_importance")
-    except:
-        feature_importance = {}
-
     predictions_table = "predictions_tmp"
     copy_to_sql(df=predicted_data.result, table_name=predictions_table,
                 index=False, if_exists="replace", temporary=True)
 
-    # calculate stats if training stats exist
-    if os.path.exists(f"{context.artifact_input_path}/data_stats.json"):
-        record_evaluation_stats(
-            features_df=test_df,
-            predicted_df=DataFrame.from_query(
-                f"SELECT * FROM {predictions_table}"),
-            feature_importance=feature_importance,
-            context=context
+    # only the confusion counts are fetched, computed in-database
+    counts = DataFrame.from_query(f"""
+        SELECT {target_name} AS y_test, Prediction AS y_pred, COUNT(*) AS cnt
+        FROM {predictions_table}
+        GROUP BY 1, 2
+    """).to_pandas().reset_index()
+    cm = [[0, 0], [0, 0]]
+    for row in counts.itertuples():
+        cm[int(row.y_test)][int(row.y_pred)] = int(row.cnt)
+
+    # the render processes start with the first plot submitted, they are shut down however the evaluation ends
+    try:
+        plots.submit("confusion_matrix", "confusion_matrix", {"matrix": cm})
+
+        roc_out = ROC(
+            data=predictions.result,
+            probability_column='Prob_1',
+            observation_column=target_name,
+            positive_class='1',
+            num_thresholds=1000
         )
 
+        # only the distinct points of the curve are fetched, thresholds with the same rates draw the same point
+        auc = float(roc_out.result.to_pandas().reset_index()['AUC'][0])
+        roc_points = DataFrame.from_query(
+            f"SELECT DISTINCT fpr, tpr FROM ({roc_out.output_data.show_query()}) r"
+        ).to_pandas().reset_index().sort_values(["fpr", "tpr"])
+
+        plots.submit("roc_curve", "roc_curve", {"auc": auc,
+                                                "fpr": roc_points["fpr"].astype(float).tolist(),
+                                                "tpr": roc_points["tpr"].astype(float).tolist()})
+
+        # Calculate feature importance and generate plot
+        try:
+            model_pdf = model.select(['classification_tree']).to_pandas(all_rows=True)['classification_tree']
+            feature_importance = compute_feature_importance(model_pdf)
+            plots.submit("feature_importance", "feature_importance", {"importance": feature_importance})
+        except:
+            feature_importance = {}
+
+        # calculate stats if training stats exist
+        if os.path.exists(f"{context.artifact_input_path}/data_stats.json"):
+            record_evaluation_stats(
+                features_df=test_df,
+                predicted_df=DataFrame.from_query(
+                    f"SELECT * FROM {predictions_table}"),
+                feature_importance=feature_importance,
+                context=context
+            )
+    finally:
+        plots.close()
+
     print("All done!")
@@ -1,5 +1,4 @@
 from teradataml import (
-    copy_to_sql,
     DataFrame,
     XGBoostPredict,
     ScaleTransform
@@ -9,7 +8,7 @@ from tmo import (
     tmo_create_context,
     ModelContext
 )
-import pandas as pd
+from .prediction_writer import FASTLOAD_MIN_ROWS, JSON_REPORT_TYPE, PredictionWriter, TeradataBackend
 
 
 def score(context: ModelContext, **kwargs):
@@ -24,8 +23,6 @@ def score(context: ModelContext, **kwargs):
     entity_key = context.dataset_info.entity_key
 
     test_df = DataFrame.from_query(context.dataset_info.sql)
-    features_tdf = DataFrame.from_query(context.dataset_info.sql)
-    features_pdf = features_tdf.to_pandas(all_rows=True)
 
     # Scaling the test set
     print(f"Loading scaler from table scaler_{context.model_version}")
@@ -49,19 +46,21 @@ def score(context: ModelContext, **kwargs):
                              'iter', 'class_num', 'tree_order']
     )
 
-    predictions_pdf = predictions.result.to_pandas(all_rows=True).rename(
-        columns={"Prediction": target_name}).astype(int)
+    # the predictions carry the entity key (id_column), only they are fetched and not the features
+    predictions_pdf = predictions.result.select([entity_key, "Prediction"]).to_pandas(all_rows=True)
+    if entity_key not in predictions_pdf.columns:
+        # teradataml uses the primary index as the pandas index
+        predictions_pdf = predictions_pdf.reset_index()
+    predictions_pdf = predictions_pdf.rename(
+        columns={"Prediction": target_name})[[entity_key, target_name]].astype(int)
 
     print("Finished Scoring")
 
     # store the predictions
-    predictions_pdf = pd.DataFrame(predictions_pdf, columns=[target_name])
-    predictions_pdf[entity_key] = features_pdf.index.values
     # add job_id column so we know which execution this is from if appended to predictions table
     predictions_pdf["job_id"] = context.job_id
 
-    # teradataml doesn't match column names on append.. and so to match / use same table schema as for byom predict
-    # example (see README.md), we must add empty json_report column and change column order manually (v17.0.0.4)
+    # the rows are appended by column name, to the same table schema as for byom predict (see README.md)
     # CREATE MULTISET TABLE pima_patient_predictions
     # (
     #     job_id VARCHAR(255), -- comes from airflow on job execution
@@ -69,18 +68,25 @@ def score(context: ModelContext, **kwargs):
     #     HasDiabetes BIGINT,   -- if model automatically extracts target
     #     json_report CLOB(1048544000) CHARACTER SET UNICODE  -- output of
     # )
-    # PRIMARY INDEX ( job_id );
+    # NO PRIMARY INDEX;
+    # the table is created like this on the first write if it doesn't exist, json_report stays NULL as this model
+    # has no report
+    hyperparams = context.hyperparams or {}
+    writer = PredictionWriter(context.dataset_info.predictions_table,
+                              schema_name=context.dataset_info.predictions_database,
+                              backend=TeradataBackend(fastload_min_rows=int(
+                                  hyperparams.get("writer_fastload_min_rows", FASTLOAD_MIN_ROWS))),
+                              batch_size=int(hyperparams.get("writer_batch_size", 10000)),
+                              sessions=int(hyperparams.get("writer_sessions", 4)),
+                              types={"json_report": JSON_REPORT_TYPE})
     predictions_pdf["json_report"] = ""
-    predictions_pdf = predictions_pdf[[
-        "job_id", entity_key, target_name, "json_report"]]
-
-    copy_to_sql(
-        df=predictions_pdf,
-        schema_name=context.dataset_info.predictions_database,
-        table_name=context.dataset_info.predictions_table,
-        index=False,
-        if_exists="append"
-    )
+    try:
+        writer.write(predictions_pdf[["job_id", entity_key, target_name, "json_report"]])
+    finally:
+        writer.close()
+
+    write_stats = writer.stats()
+    print(f"Wrote {write_stats['rows']} predictions at {write_stats['rows_per_s']:.0f} rows/s")
 
     print("Saved predictions in Teradata")
 
@@ -92,7 +98,7 @@ def score(context: ModelContext, **kwargs):
             WHERE job_id = '{context.job_id}'
     """)
 
-    record_scoring_stats(features_df=features_tdf,
+    record_scoring_stats(features_df=test_df,
                          predicted_df=predictions_df, context=context)
 
     print("All done!")
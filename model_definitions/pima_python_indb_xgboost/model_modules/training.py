@@ -1,6 +1,8 @@
 from teradataml import (
     DataFrame,
+    execute_sql,
     XGBoost,
+    XGBoostPredict,
     ScaleFit,
     ScaleTransform,
 )
@@ -11,10 +13,14 @@ from tmo import (
     ModelContext
 )
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
 
 import matplotlib.pyplot as plt
 import pandas as pd
 import json
+import multiprocessing
+import time
 
 
 def traverse_tree(tree, feature_counter):
@@ -46,6 +52,123 @@ def plot_feature_importance(fi, img_filename):
     plt.clf()
 
 
+# XGBoost arguments we take from the hyperparameters, with the type teradataml expects. Note that config.json's
+# tree_size is a fraction while teradataml's tree_size is a row count, so it is not forwarded.
+XGBOOST_PARAMS = {
+    "max_depth": int,
+    "num_boosted_trees": int,
+    "lambda1": float,
+    "shrinkage_factor": float,
+    "column_sampling": float,
+    "min_node_size": int
+}
+
+
+def xgboost_params(hyperparams):
+    return {name: cast(hyperparams[name]) for name, cast in XGBOOST_PARAMS.items() if name in hyperparams}
+
+
+def expand_sweep_grid(base_params, sweep):
+    unknown = sorted(name for name in sweep if name not in XGBOOST_PARAMS)
+    if unknown:
+        raise ValueError(f"Unsupported sweep parameters {unknown}, expected some of {sorted(XGBOOST_PARAMS)}")
+    names = list(sweep)
+    trials = []
+    for values in product(*[sweep[name] for name in names]):
+        params = dict(base_params)
+        params.update({name: XGBOOST_PARAMS[name](value) for name, value in zip(names, values)})
+        trials.append(params)
+    return trials
+
+
+def holdout_accuracy(model, holdout_df, target_name, entity_key):
+    predictions = XGBoostPredict(
+        object=model.result,
+        newdata=holdout_df,
+        model_type='Classification',
+        accumulate=target_name,
+        id_column=entity_key,
+        output_prob=True,
+        output_responses=['0', '1'],
+        object_order_column=['task_index', 'tree_num',
+                             'iter', 'class_num', 'tree_order']
+    )
+
+    # only a single row comes back to the client
+    accuracy_df = DataFrame.from_query(f"""
+        SELECT
+            AVG(CASE WHEN CAST(p.Prediction AS INTEGER) = p.{target_name} THEN 1.0 ELSE 0.0 END) AS accuracy
+        FROM ({predictions.result.show_query()}) p
+    """)
+    return float(accuracy_df.to_pandas().reset_index()["accuracy"][0])
+
+
+def drop_table(table):
+    try:
+        execute_sql(f"DROP TABLE {table}")
+    except Exception as e:
+        print(f"Failed to drop {table}: {str(e)}")
+
+
+def init_sweep_worker():
+    # the teradataml context is process wide, every worker process has its own and so its own session
+    tmo_create_context()
+
+
+def run_trial(trial_id, params, train_table, holdout_table, model_table, feature_names, target_name, entity_key,
+              model_type):
+    """Train and score one trial on the scaled fold tables, persisting its model to model_table."""
+    start = time.time()
+    try:
+        model = XGBoost(
+            data=DataFrame(train_table),
+            input_columns=feature_names,
+            response_column=target_name,
+            model_type=model_type,
+            **params
+        )
+        accuracy = holdout_accuracy(model, DataFrame(holdout_table), target_name, entity_key)
+        model.result.to_sql(model_table, if_exists="replace")
+        error = None
+    except Exception as e:
+        model_table, accuracy, error = None, None, str(e)
+
+    return {
+        "trial": trial_id,
+        "params": params,
+        "accuracy": accuracy,
+        "wall_time_s": round(time.time() - start, 3),
+        "model_table": model_table,
+        "error": error
+    }
+
+
+def run_sweep(trials, train_table, holdout_table, model_table_prefix, feature_names, target_name, entity_key,
+              model_type, concurrency):
+    """
+    Run the trials, up to `concurrency` at once in worker processes with a teradataml context (database session)
+    each, and return the leaderboard, best first. Every successful trial's model is in its leaderboard model_table.
+    """
+    print(f"Running sweep of {len(trials)} trials with concurrency {concurrency}...")
+    args = [(i, params, train_table, holdout_table, f"{model_table_prefix}_{i}", feature_names, target_name,
+             entity_key, model_type) for i, params in enumerate(trials)]
+
+    if concurrency <= 1:
+        results = [run_trial(*trial_args) for trial_args in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(concurrency, len(trials)),
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=init_sweep_worker) as executor:
+            futures = [executor.submit(run_trial, *trial_args) for trial_args in args]
+            results = [future.result() for future in futures]
+
+    leaderboard = sorted(results, key=lambda r: (r["accuracy"] is None, -(r["accuracy"] or 0.0), r["wall_time_s"]))
+    if leaderboard[0]["accuracy"] is None:
+        raise RuntimeError(f"All sweep trials failed, first error: {leaderboard[0]['error']}")
+
+    return leaderboard
+
+
 def train(context: ModelContext, **kwargs):
     tmo_create_context()
 
@@ -65,10 +188,22 @@ def train(context: ModelContext, **kwargs):
     multiplier = str(context.hyperparams["multiplier"])
     intercept = str(context.hyperparams["intercept"])
     model_type = str(context.hyperparams["model_type"])
-    lambda1 = float(context.hyperparams["lambda1"])
+    params = xgboost_params(context.hyperparams)
+    sweep = context.hyperparams.get("sweep")
+
+    if sweep:
+        # split once in-database and persist so every trial sees the same folds
+        holdout_frac = float(context.hyperparams.get("sweep_holdout_frac", 0.2))
+        split_table = f"sweep_split_{context.model_version}"
+        train_df.sample(frac=[1 - holdout_frac, holdout_frac]).to_sql(
+            split_table, if_exists="replace", temporary=True)
+        fit_df = DataFrame.from_query(f"SELECT * FROM {split_table} WHERE sampleid = 1")
+        holdout_df = DataFrame.from_query(f"SELECT * FROM {split_table} WHERE sampleid = 2")
+    else:
+        fit_df = train_df
 
     scaler = ScaleFit(
-        data=train_df,
+        data=fit_df,
         target_columns=feature_names,
         scale_method=scale_method,
         miss_value=miss_value,
@@ -78,7 +213,7 @@ def train(context: ModelContext, **kwargs):
     )
 
     scaled_train = ScaleTransform(
-        data=train_df,
+        data=fit_df,
         object=scaler.output,
         accumulate=[target_name, entity_key]
     )
@@ -89,20 +224,53 @@ def train(context: ModelContext, **kwargs):
 
     print("Starting training...")
 
-    model = XGBoost(
-        data=scaled_train.result,
-        input_columns=feature_names,
-        response_column=target_name,
-        model_type=model_type,
-        lambda1=lambda1
-    )
+    if sweep:
+        # materialise the scaled folds once so the trials don't each recompute ScaleTransform, as permanent tables
+        # since the trials' worker sessions read them
+        scaled_train_table = f"sweep_train_{context.model_version}"
+        scaled_holdout_table = f"sweep_holdout_{context.model_version}"
+        model_table_prefix = f"sweep_model_{context.model_version}"
+        trials = expand_sweep_grid(params, sweep)
+        try:
+            scaled_train.result.to_sql(scaled_train_table, if_exists="replace")
+            ScaleTransform(
+                data=holdout_df,
+                object=scaler.output,
+                accumulate=[target_name, entity_key]
+            ).result.to_sql(scaled_holdout_table, if_exists="replace")
+
+            leaderboard = run_sweep(
+                trials, scaled_train_table, scaled_holdout_table, model_table_prefix,
+                feature_names, target_name, entity_key, model_type,
+                concurrency=int(context.hyperparams.get("sweep_concurrency", 2)))
+
+            DataFrame(leaderboard[0]["model_table"]).to_sql(f"model_{context.model_version}", if_exists="replace")
+        finally:
+            for table in [scaled_train_table, scaled_holdout_table] + \
+                         [f"{model_table_prefix}_{i}" for i in range(len(trials))]:
+                drop_table(table)
+
+        with open(f"{context.artifact_output_path}/sweep_leaderboard.json", "w+") as f:
+            # the trials' model tables are dropped, only the best is kept as model_<version>
+            json.dump([{k: v for k, v in r.items() if k != "model_table"} for r in leaderboard], f, indent=2)
+        print(f"Best trial {leaderboard[0]['trial']} with accuracy {leaderboard[0]['accuracy']:.4f}: "
+              f"{leaderboard[0]['params']}")
+    else:
+        model = XGBoost(
+            data=scaled_train.result,
+            input_columns=feature_names,
+            response_column=target_name,
+            model_type=model_type,
+            **params
+        )
+        model.result.to_sql(
+            f"model_{context.model_version}", if_exists="replace")
 
-    model.result.to_sql(
-        f"model_{context.model_version}", if_exists="replace")
     print(f"Saved trained model in table model_{context.model_version}")
+    model_df = DataFrame(f"model_{context.model_version}")
 
     # Calculate feature importance and generate plot
-    model_pdf = model.result.to_pandas()['classification_tree']
+    model_pdf = model_df.to_pandas()['classification_tree']
     feature_importance = compute_feature_importance(model_pdf)
     plot_feature_importance(
         feature_importance, f"{context.artifact_output_path}/feature_importance")
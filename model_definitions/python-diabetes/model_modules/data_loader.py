@@ -0,0 +1,124 @@
+"""
+Compact, dtype-aware loading of the model datasets.
+
+`to_pandas(all_rows=True)` returns the features and the entity key as int64 / float64. `load_compact` narrows every
+numeric column to the smallest dtype that holds it: integer columns to the narrowest int type covering both the
+training range in data_stats.json and the loaded values (so a value outside the training range widens the dtype
+instead of overflowing), and float features to float32, the precision XGBoost works in anyway. The dtypes and
+memory saved are reported per load.
+
+`feature_matrix` copies the features once into a C-contiguous float32 matrix which XGBoost uses as is, and
+`feature_frame` wraps it with the feature names (for the sklearn pipeline) without copying.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+INT_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def load_stats(filename):
+    """The data_stats.json at `filename`, None if it doesn't exist (e.g. when training the first version)."""
+    if not os.path.exists(filename):
+        return None
+    with open(filename, "r") as f:
+        return json.load(f)
+
+
+def stats_ranges(data_stats):
+    """{lowercase column: (min, max)} of the continuous features and integer coded categorical targets."""
+    if not data_stats:
+        return {}
+
+    ranges = {}
+    for group in ("features", "targets"):
+        for name, column in data_stats.get(group, {}).items():
+            statistics = column.get("statistics", {})
+            if "min" in statistics and "max" in statistics:
+                ranges[name.lower()] = (statistics["min"], statistics["max"])
+            elif column.get("category_dictionary"):
+                try:
+                    codes = [float(c) for c in column["category_dictionary"]]
+                except ValueError:
+                    continue
+                ranges[name.lower()] = (min(codes), max(codes))
+    return ranges
+
+
+def narrowest_int(low, high):
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return np.int64
+
+
+def compact_dtypes(df, data_stats=None, float32_columns=None):
+    """The narrowed dtype of every numeric column of df whose dtype changes."""
+    ranges = stats_ranges(data_stats)
+    float32_columns = {c.lower() for c in (float32_columns if float32_columns is not None else df.columns)}
+
+    dtypes = {}
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_bool_dtype(values) or not pd.api.types.is_numeric_dtype(values):
+            continue
+
+        if pd.api.types.is_integer_dtype(values):
+            if len(values) == 0:
+                continue
+            low, high = int(values.min()), int(values.max())
+            if str(column).lower() in ranges:
+                stats_low, stats_high = ranges[str(column).lower()]
+                low, high = min(low, int(np.floor(stats_low))), max(high, int(np.ceil(stats_high)))
+            dtype = narrowest_int(low, high)
+        elif str(column).lower() in float32_columns:
+            dtype = np.float32
+        else:
+            continue
+
+        if values.dtype != dtype:
+            dtypes[column] = dtype
+    return dtypes
+
+
+def compact(df, data_stats=None, float32_columns=None):
+    """Return df with its numeric columns narrowed (see compact_dtypes) and a report of the memory saved."""
+    bytes_before = int(df.memory_usage(deep=True, index=True).sum())
+
+    dtypes = compact_dtypes(df, data_stats=data_stats, float32_columns=float32_columns)
+    if dtypes:
+        df = df.astype(dtypes, copy=False)
+
+    bytes_after = int(df.memory_usage(deep=True, index=True).sum())
+    report = {
+        "rows": len(df),
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "bytes_saved": bytes_before - bytes_after,
+        "dtypes": {str(c): np.dtype(d).name for c, d in dtypes.items()}
+    }
+    return df, report
+
+
+def load_compact(tdf, data_stats=None, float32_columns=None):
+    """Load the teradataml DataFrame tdf into a compact pandas DataFrame, printing the memory saved."""
+    df, report = compact(tdf.to_pandas(all_rows=True), data_stats=data_stats, float32_columns=float32_columns)
+    print(f"Loaded {report['rows']} rows in {report['bytes_after'] / 2 ** 20:.2f} MB "
+          f"({report['bytes_saved'] / 2 ** 20:.2f} MB saved by {report['dtypes']})")
+    return df, report
+
+
+def feature_matrix(df, feature_names):
+    """The features of df as a C-contiguous float32 matrix, filled column by column in a single copy."""
+    X = np.empty((len(df), len(feature_names)), dtype=np.float32, order="C")
+    for i, name in enumerate(feature_names):
+        X[:, i] = df[name].to_numpy()
+    return X
+
+
+def feature_frame(X, feature_names, index=None):
+    """Wrap the feature matrix X in a DataFrame with the feature names, sharing its memory."""
+    return pd.DataFrame(X, columns=feature_names, index=index, copy=False)
@@ -0,0 +1,129 @@
+"""
+Data drift of scoring data against the training histograms in data_stats.json.
+
+Incoming rows are binned with the stored training edges (values outside the edges count in the first / last bin)
+and the accumulated counts are compared to the training counts with PSI, Kolmogorov-Smirnov (on the binned CDFs)
+and Jensen-Shannon divergence per feature. Binning is a single searchsorted per column, so a batch costs
+milliseconds and counts can be accumulated across streamed chunks or REST requests.
+"""
+import json
+import threading
+
+import numpy as np
+
+# smoothing for empty bins so PSI / JS stay finite
+EPSILON = 1e-6
+
+# usual PSI rule of thumb: < 0.1 no drift, 0.1 - 0.2 moderate, > 0.2 significant
+PSI_THRESHOLD = 0.2
+
+
+def psi(expected, actual):
+    p = np.maximum(expected, EPSILON)
+    q = np.maximum(actual, EPSILON)
+    return float(np.sum((q - p) * np.log(q / p)))
+
+
+def ks(expected, actual):
+    return float(np.max(np.abs(np.cumsum(expected) - np.cumsum(actual))))
+
+
+def jensen_shannon(expected, actual):
+    p = np.maximum(expected, EPSILON)
+    q = np.maximum(actual, EPSILON)
+    p, q = p / p.sum(), q / q.sum()
+    m = (p + q) / 2
+    return float((np.sum(p * np.log2(p / m)) + np.sum(q * np.log2(q / m))) / 2)
+
+
+class DriftMonitor(object):
+    """
+    Accumulates binned counts of scoring data and reports drift against the training histograms.
+
+    Columns are matched case-insensitively by name for DataFrames. Arrays without column names must have their
+    columns in the order of `features`, the features without a training histogram are skipped by name.
+    """
+
+    def __init__(self, data_stats, features=None, psi_threshold=PSI_THRESHOLD):
+        histograms = {name.lower(): feature["statistics"]["histogram"]
+                      for name, feature in data_stats["features"].items()
+                      if "histogram" in feature.get("statistics", {})}
+
+        columns = list(features or histograms.keys())
+        self.features = [f for f in columns if f.lower() in histograms]
+        # arrays carry no column names, their monitored columns are picked by the position of the name in `features`
+        self.positions = [columns.index(f) for f in self.features]
+        self.edges = [np.asarray(histograms[f.lower()]["edges"], dtype=np.float64) for f in self.features]
+        self.expected = [np.asarray(histograms[f.lower()]["values"], dtype=np.float64) for f in self.features]
+        self.expected = [values / values.sum() if values.sum() else values for values in self.expected]
+        self.psi_threshold = psi_threshold
+
+        self.counts = [np.zeros(len(edges) - 1) for edges in self.edges]
+        self.num_rows = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, filename, features=None, psi_threshold=PSI_THRESHOLD):
+        with open(filename, "r") as f:
+            return cls(json.load(f), features=features, psi_threshold=psi_threshold)
+
+    def _matrix(self, data):
+        if hasattr(data, "columns"):
+            columns = {str(c).lower(): c for c in data.columns}
+            return np.asarray(data[[columns[f.lower()] for f in self.features]], dtype=np.float64)
+        X = np.asarray(data, dtype=np.float64)
+        X = X.reshape(1, -1) if X.ndim == 1 else X
+        return X[:, self.positions]
+
+    def bin_counts(self, data):
+        """Return the per-feature histogram counts of a batch without accumulating them."""
+        X = self._matrix(data)
+        counts = []
+        for i, edges in enumerate(self.edges):
+            values = X[:, i]
+            values = values[~np.isnan(values)]
+            bins = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(edges) - 2)
+            counts.append(np.bincount(bins, minlength=len(edges) - 1).astype(np.float64))
+        return counts, X.shape[0]
+
+    def update(self, data):
+        counts, rows = self.bin_counts(data)
+        with self._lock:
+            self.counts = [a + b for a, b in zip(self.counts, counts)]
+            self.num_rows += rows
+        return self
+
+    def _report(self, counts, num_rows):
+        features = {}
+        for f, expected, actual in zip(self.features, self.expected, counts):
+            total = actual.sum()
+            if not total:
+                continue
+            actual = actual / total
+            features[f] = {
+                "psi": psi(expected, actual),
+                "ks": ks(expected, actual),
+                "js": jensen_shannon(expected, actual),
+            }
+            features[f]["drift"] = features[f]["psi"] > self.psi_threshold
+
+        return {
+            "num_rows": num_rows,
+            "drifted_features": [f for f, m in features.items() if m["drift"]],
+            "features": features
+        }
+
+    def report(self):
+        """Drift of everything accumulated so far."""
+        with self._lock:
+            counts, num_rows = list(self.counts), self.num_rows
+        return self._report(counts, num_rows)
+
+    def batch_report(self, data):
+        """Drift of a single batch, independent of what has been accumulated."""
+        return self._report(*self.bin_counts(data))
+
+    def reset(self):
+        with self._lock:
+            self.counts = [np.zeros_like(c) for c in self.counts]
+            self.num_rows = 0
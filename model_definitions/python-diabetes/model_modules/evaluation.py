@@ -1,17 +1,16 @@
 from sklearn import metrics
-from sklearn.metrics import ConfusionMatrixDisplay
-from sklearn.metrics import RocCurveDisplay
 from teradataml import DataFrame, copy_to_sql
 from tmo import (
     record_evaluation_stats,
-    save_plot,
     tmo_create_context,
     ModelContext
 )
+from .data_loader import feature_frame, feature_matrix, load_compact, load_stats
+from .stages import StageRunner, Result
+from . import plots
 
 import joblib
 import json
-import numpy as np
 import pandas as pd
 
 
@@ -25,9 +24,11 @@ def evaluate(context: ModelContext, **kwargs):
     target_name = context.dataset_info.target_names[0]
 
     test_df = DataFrame.from_query(context.dataset_info.sql)
-    test_pdf = test_df.to_pandas(all_rows=True)
+    test_pdf, _ = load_compact(test_df,
+                               data_stats=load_stats(f"{context.artifact_input_path}/data_stats.json"),
+                               float32_columns=feature_names)
 
-    X_test = test_pdf[feature_names]
+    X_test = feature_frame(feature_matrix(test_pdf, feature_names), feature_names, index=test_pdf.index)
     y_test = test_pdf[target_name]
 
     print("Scoring")
@@ -36,6 +37,34 @@ def evaluate(context: ModelContext, **kwargs):
     y_pred_tdf = pd.DataFrame(y_pred, columns=[target_name])
     y_pred_tdf["PatientId"] = test_pdf["PatientId"].values
 
+    output_path = context.artifact_output_path
+    hyperparams = context.hyperparams or {}
+
+    # everything below only depends on the predictions, so independent steps run concurrently: database writes
+    # on a thread, plots and SHAP in worker processes
+    runner = StageRunner(io_workers=int(hyperparams.get("eval_io_workers", 1)),
+                         cpu_workers=int(hyperparams.get("eval_cpu_workers", 2)))
+
+    runner.add("metrics", save_metrics, y_test, y_pred, output_path)
+    runner.add("confusion_matrix", plots.plot_confusion_matrix, y_test, y_pred, output_path, kind="cpu")
+    runner.add("roc_curve", plots.plot_roc_curve, y_test, y_pred, output_path, kind="cpu")
+    runner.add("shap", plots.shap_importance, f"{context.artifact_input_path}/model.joblib", X_test, feature_names,
+               output_path, kind="cpu")
+
+    predictions_table = "evaluation_preds_tmp"
+    runner.add("write_predictions", copy_to_sql, df=y_pred_tdf, table_name=predictions_table, index=False,
+               if_exists="replace", temporary=True, kind="io")
+    runner.add("record_evaluation_stats", record_stats, test_df, predictions_table, Result("shap"), context,
+               deps=["write_predictions"], kind="io")
+
+    try:
+        runner.run()
+    finally:
+        timeline = runner.save_timeline(f"{output_path}/evaluation_timeline.json")
+        print("Evaluation stages: " + ", ".join(f"{t['stage']} {t['duration_s'] or 0:.2f}s" for t in timeline))
+
+
+def save_metrics(y_test, y_pred, output_path):
     evaluation = {
         'Accuracy': '{:.2f}'.format(metrics.accuracy_score(y_test, y_pred)),
         'Recall': '{:.2f}'.format(metrics.recall_score(y_test, y_pred)),
@@ -43,32 +72,11 @@ def evaluate(context: ModelContext, **kwargs):
         'f1-score': '{:.2f}'.format(metrics.f1_score(y_test, y_pred))
     }
 
-    with open(f"{context.artifact_output_path}/metrics.json", "w+") as f:
+    with open(f"{output_path}/metrics.json", "w+") as f:
         json.dump(evaluation, f)
 
-    ConfusionMatrixDisplay.from_predictions(y_test, y_pred)
-    save_plot('Confusion Matrix', context=context)
-
-    RocCurveDisplay.from_predictions(y_test, y_pred)
-    save_plot('ROC Curve', context=context)
-
-    # xgboost has its own feature importance plot support but lets use shap as explainability example
-    import shap
-
-    shap_explainer = shap.TreeExplainer(model['xgb'])
-    shap_values = shap_explainer.shap_values(X_test)
-
-    shap.summary_plot(shap_values, X_test, feature_names=feature_names,
-                      show=False, plot_size=(12, 8), plot_type='bar')
-    save_plot('SHAP Feature Importance', context=context)
-
-    feature_importance = pd.DataFrame(list(zip(feature_names, np.abs(shap_values).mean(0))),
-                                      columns=['col_name', 'feature_importance_vals'])
-    feature_importance = feature_importance.set_index("col_name").T.to_dict(orient='records')[0]
-
-    predictions_table = "evaluation_preds_tmp"
-    copy_to_sql(df=y_pred_tdf, table_name=predictions_table, index=False, if_exists="replace", temporary=True)
 
+def record_stats(test_df, predictions_table, feature_importance, context):
     record_evaluation_stats(features_df=test_df,
                             predicted_df=DataFrame.from_query(f"SELECT * FROM {predictions_table}"),
                             importance=feature_importance,
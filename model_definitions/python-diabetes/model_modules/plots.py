@@ -0,0 +1,53 @@
+"""
+Evaluation plots and SHAP importance, run as cpu stages in worker processes (see stages.py).
+
+This module only imports plotting / model dependencies, and only inside the functions, so the spawned workers
+start without loading the database dependencies of evaluation.py.
+"""
+
+
+def save_figure(title, output_path, dpi=500):
+    # same file naming as tmo's save_plot
+    import matplotlib.pyplot as plt
+
+    plt.gcf().savefig(f"{output_path}/{title.replace(' ', '_').lower()}", dpi=dpi)
+    plt.clf()
+
+
+def plot_confusion_matrix(y_test, y_pred, output_path):
+    import matplotlib
+    matplotlib.use("Agg")
+    from sklearn.metrics import ConfusionMatrixDisplay
+
+    ConfusionMatrixDisplay.from_predictions(y_test, y_pred)
+    save_figure('Confusion Matrix', output_path)
+
+
+def plot_roc_curve(y_test, y_pred, output_path):
+    import matplotlib
+    matplotlib.use("Agg")
+    from sklearn.metrics import RocCurveDisplay
+
+    RocCurveDisplay.from_predictions(y_test, y_pred)
+    save_figure('ROC Curve', output_path)
+
+
+def shap_importance(model_file, X_test, feature_names, output_path):
+    """Plot the SHAP feature importance of the model's xgboost step and return the mean |SHAP| per feature."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import joblib
+    import numpy as np
+    import shap
+
+    model = joblib.load(model_file)
+
+    # xgboost has its own feature importance plot support but lets use shap as explainability example
+    shap_explainer = shap.TreeExplainer(model['xgb'])
+    shap_values = shap_explainer.shap_values(X_test)
+
+    shap.summary_plot(shap_values, X_test, feature_names=feature_names,
+                      show=False, plot_size=(12, 8), plot_type='bar')
+    save_figure('SHAP Feature Importance', output_path)
+
+    return dict(zip(feature_names, np.abs(shap_values).mean(0).tolist()))
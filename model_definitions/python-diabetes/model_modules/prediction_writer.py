@@ -0,0 +1,279 @@
+"""
+Bulk, parallel writer of batch scoring predictions.
+
+Rows are written in fixed-size batches, each a single parameterized multi-row INSERT (executemany) naming its
+columns, by a pool of worker threads with one database session each. Large frames go through teradataml's FastLoad
+instead when it is available: they are fastloaded into a staging table, since FastLoad requires an empty table, and
+appended to the predictions table with one INSERT ... SELECT.
+
+The predictions table is created on the first write if it doesn't exist, with the column types of the first frame
+(or `types`), the `primary_index` and SET / MULTISET semantics the writer is given, as copy_to_sql did. CLOB columns
+(json_report in the predictions table schema) are then left out of the INSERT when every value is empty, so rows don't
+carry an empty LOB each and the column is NULL instead. As the columns are named, the frame's column order doesn't
+need to match the table's.
+
+`SQLiteBackend` is a local stand-in for the database, to run and time the writer without a Vantage system (its
+tables are created through the same first write, but have no primary index or SET semantics):
+
+    writer = PredictionWriter("pima_patient_predictions", backend=SQLiteBackend("/tmp/predictions.db"), sessions=4)
+    writer.write(predictions_pdf)
+    print(writer.stats())
+"""
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# FastLoad has a fixed per job cost and is only worth it for large loads (teradataml recommends it above 100k rows)
+FASTLOAD_MIN_ROWS = 100000
+
+# the json_report column of the predictions table schema (see README.md)
+JSON_REPORT_TYPE = "CLOB(1048544000) CHARACTER SET UNICODE"
+
+
+class TeradataBackend(object):
+    """Writes through sessions of the teradataml context, one per worker thread."""
+
+    paramstyle = "?"
+
+    def __init__(self, fastload=True, fastload_min_rows=FASTLOAD_MIN_ROWS):
+        self.fastload = fastload
+        self.fastload_min_rows = fastload_min_rows
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            from teradataml import get_context
+
+            # a new DBAPI connection, and so database session, from the context's engine
+            connection = get_context().raw_connection()
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def create_table(self, table, schema_name, column_types, primary_index=None, set_table=False):
+        """Create the table unless it exists, returning whether it was created."""
+        from teradataml import execute_sql
+
+        database = f"'{schema_name}'" if schema_name else "DATABASE"
+        exists = execute_sql(f"SELECT COUNT(*) FROM DBC.TablesV "
+                             f"WHERE DatabaseName = {database} AND TableName = '{table}'").fetchone()[0]
+        if exists:
+            return False
+
+        fqtn = f"{schema_name}.{table}" if schema_name else table
+        columns = ", ".join(f"{name} {sql_type}" for name, sql_type in column_types.items())
+        index = f"PRIMARY INDEX ({', '.join(primary_index)})" if primary_index else "NO PRIMARY INDEX"
+        execute_sql(f"CREATE {'SET' if set_table else 'MULTISET'} TABLE {fqtn} ({columns}) {index}")
+        return True
+
+    def insert(self, table, columns, rows):
+        cursor = self._connection().cursor()
+        try:
+            cursor.executemany(insert_sql(table, columns, self.paramstyle), rows)
+        finally:
+            cursor.close()
+
+    def can_bulk_load(self, num_rows):
+        if not self.fastload or num_rows < self.fastload_min_rows:
+            return False
+        try:
+            from teradataml import fastload  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def bulk_load(self, table, schema_name, df, sessions, batch_size):
+        from teradataml import execute_sql, fastload
+
+        staging = f"{table}_stg_{int(time.time() * 1000)}"
+        fqtn = f"{schema_name}.{table}" if schema_name else table
+        staging_fqtn = f"{schema_name}.{staging}" if schema_name else staging
+        columns = ", ".join(df.columns)
+
+        fastload(df=df, table_name=staging, schema_name=schema_name, if_exists="replace", index=False,
+                 open_sessions=sessions, batch_size=batch_size)
+        try:
+            execute_sql(f"INSERT INTO {fqtn} ({columns}) SELECT {columns} FROM {staging_fqtn}")
+        finally:
+            execute_sql(f"DROP TABLE {staging_fqtn}")
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+
+class SQLiteBackend(object):
+    """Local stand-in writing to a SQLite database file."""
+
+    paramstyle = "?"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # sqlite has a single writer, the workers wait for the database lock rather than fail
+            connection = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def create_table(self, table, schema_name, column_types, primary_index=None, set_table=False):
+        connection = self._connection()
+        with connection:
+            exists = connection.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                        [table]).fetchone()[0]
+            if exists:
+                return False
+            connection.execute(f"CREATE TABLE {table} ({', '.join(column_types)})")
+        return True
+
+    def insert(self, table, columns, rows):
+        connection = self._connection()
+        with connection:
+            connection.executemany(insert_sql(table, columns, self.paramstyle), rows)
+
+    def can_bulk_load(self, num_rows):
+        return False
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+
+def insert_sql(table, columns, paramstyle="?"):
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join([paramstyle] * len(columns))})"
+
+
+def sql_types(df, types=None):
+    """Teradata column types of the frame's columns, `types` overriding the ones inferred from the dtypes."""
+    import pandas as pd
+
+    column_types = {}
+    for column in df.columns:
+        if types and column in types:
+            column_types[column] = types[column]
+        elif pd.api.types.is_bool_dtype(df[column]):
+            column_types[column] = "BYTEINT"
+        elif pd.api.types.is_integer_dtype(df[column]):
+            column_types[column] = "BIGINT"
+        elif pd.api.types.is_float_dtype(df[column]):
+            column_types[column] = "FLOAT"
+        else:
+            column_types[column] = "VARCHAR(255) CHARACTER SET UNICODE"
+    return column_types
+
+
+def empty_columns(df, columns):
+    """The `columns` of df where every value is null or an empty string."""
+    empty = []
+    for column in columns:
+        if column in df.columns:
+            values = df[column]
+            if values.isna().all() or (values.astype(str) == "").all():
+                empty.append(column)
+    return empty
+
+
+class PredictionWriter(object):
+    """
+    Appends prediction frames to `table` in batches of `batch_size` rows over `sessions` parallel sessions,
+    creating it on the first write if it doesn't exist. Empty `clob_columns` are skipped. The rows / batches / time
+    written are kept in `stats()`.
+    """
+
+    def __init__(self, table, schema_name=None, backend=None, batch_size=10000, sessions=4,
+                 clob_columns=("json_report",), primary_index=None, set_table=False, types=None):
+        self.table = table
+        self.schema_name = schema_name
+        self.backend = backend if backend is not None else TeradataBackend()
+        self.batch_size = batch_size
+        self.sessions = sessions
+        self.clob_columns = clob_columns
+        self.primary_index = primary_index
+        self.set_table = set_table
+        self.types = types
+        self._table_checked = False
+
+        self.rows = 0
+        self.batches = 0
+        self.write_time = 0.0
+        self.skipped_columns = set()
+        self.paths = set()
+        # the workers keep their session across writes
+        self._pool = None
+
+    @property
+    def fqtn(self):
+        return f"{self.schema_name}.{self.table}" if self.schema_name else self.table
+
+    def write(self, df):
+        """Append the rows of the pandas DataFrame df, returning the number of rows written."""
+        start = time.perf_counter()
+
+        if not self._table_checked:
+            # before dropping the empty columns, the table has all of the frame's columns
+            if self.backend.create_table(self.table, self.schema_name, sql_types(df, self.types),
+                                         primary_index=self.primary_index, set_table=self.set_table):
+                print(f"Created table {self.fqtn}")
+            self._table_checked = True
+
+        skipped = empty_columns(df, self.clob_columns)
+        if skipped:
+            df = df.drop(columns=skipped)
+            self.skipped_columns.update(skipped)
+        columns = list(df.columns)
+
+        if self.backend.can_bulk_load(len(df)):
+            self.backend.bulk_load(self.table, self.schema_name, df, self.sessions, self.batch_size)
+            self.paths.add("fastload")
+            batches = 1
+        else:
+            # python scalars, DBAPI drivers don't take numpy types
+            rows = df.astype(object).where(df.notna(), None).values.tolist()
+            batches = [rows[i:i + self.batch_size] for i in range(0, len(rows), self.batch_size)]
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.sessions, thread_name_prefix="prediction-writer")
+            # list() re-raises the first failed batch
+            list(self._pool.map(lambda batch: self.backend.insert(self.fqtn, columns, batch), batches))
+            self.paths.add("batch_insert")
+            batches = len(batches)
+
+        self.rows += len(df)
+        self.batches += batches
+        self.write_time += time.perf_counter() - start
+        return len(df)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self.backend.close()
+
+    def stats(self):
+        return {
+            "table": self.fqtn,
+            "rows": self.rows,
+            "batches": self.batches,
+            "sessions": self.sessions,
+            "write_time_s": self.write_time,
+            "rows_per_s": self.rows / self.write_time if self.write_time else 0.0,
+            "skipped_columns": sorted(self.skipped_columns),
+            "paths": sorted(self.paths)
+        }
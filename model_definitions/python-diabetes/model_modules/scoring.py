@@ -1,13 +1,21 @@
-from teradataml import copy_to_sql, DataFrame
-from tmo import (
-    record_scoring_stats,
-    tmo_create_context,
-    ModelContext
-)
+from .data_loader import feature_frame, feature_matrix, load_compact, load_stats
+from .drift import DriftMonitor
+from .prediction_cache import PredictionCache, artefact_hash
+from .prediction_writer import FASTLOAD_MIN_ROWS, JSON_REPORT_TYPE, PredictionWriter, TeradataBackend
+from .shadow import ShadowComparison, load_models
+from .lazy_import import lazy_import
 
 import joblib
+import json
+import os
 import pandas as pd
 
+# only batch scoring uses these, so the RESTful ModelScorer starts without loading them (pandas isn't
+# deferred, data_loader imports it anyway)
+copy_to_sql, DataFrame = lazy_import("teradataml", "copy_to_sql", "DataFrame")
+record_scoring_stats, tmo_create_context, ModelContext = lazy_import(
+    "tmo", "record_scoring_stats", "tmo_create_context", "ModelContext")
+
 
 def score(context: ModelContext, **kwargs):
 
@@ -20,40 +28,79 @@ def score(context: ModelContext, **kwargs):
     entity_key = context.dataset_info.entity_key
 
     features_tdf = DataFrame.from_query(context.dataset_info.sql)
-    features_pdf = features_tdf.to_pandas(all_rows=True)
+    features_pdf, _ = load_compact(features_tdf,
+                                   data_stats=load_stats(f"{context.artifact_input_path}/data_stats.json"),
+                                   float32_columns=feature_names)
+    X = feature_frame(feature_matrix(features_pdf, feature_names), feature_names, index=features_pdf.index)
 
     print("Scoring")
-    predictions_pdf = model.predict(features_pdf[feature_names])
+    predictions_pdf = model.predict(X)
+
+    # shadow score the same rows with the challenger versions, only their agreement with this model is stored
+    hyperparams = context.hyperparams or {}
+    shadow_models = hyperparams.get("shadow_models")
+    if shadow_models:
+        challengers = load_models(shadow_models)
+        shadow = ShadowComparison(context.model_version, challengers)
+        shadow.update(predictions_pdf, {name: challenger.predict(X)
+                                        for name, challenger in challengers.items()})
+
+        shadow_report = shadow.save(f"{context.artifact_output_path}/shadow_report.json")
+        for name, report in shadow_report["challengers"].items():
+            print(f"Challenger {name}: disagreement {report['disagreement_rate']:.2%}, lift {report['lift']}")
+
+        if hyperparams.get("shadow_stats_table"):
+            copy_to_sql(df=pd.DataFrame(shadow.rows(context.job_id)),
+                        schema_name=context.dataset_info.predictions_database,
+                        table_name=hyperparams["shadow_stats_table"],
+                        index=False,
+                        if_exists="append")
 
     print("Finished Scoring")
 
+    # check the scoring data against the training histograms before recording stats
+    if os.path.exists(f"{context.artifact_input_path}/data_stats.json"):
+        drift = DriftMonitor.from_file(f"{context.artifact_input_path}/data_stats.json", features=feature_names)
+        drift_report = drift.update(X).report()
+        print(f"Drifted features: {drift_report['drifted_features']}")
+
+        with open(f"{context.artifact_output_path}/drift_report.json", "w+") as f:
+            json.dump(drift_report, f, indent=2)
+
     # store the predictions
     predictions_pdf = pd.DataFrame(predictions_pdf, columns=[target_name])
     predictions_pdf[entity_key] = features_pdf.index.values
     # add job_id column so we know which execution this is from if appended to predictions table
     predictions_pdf["job_id"] = context.job_id
 
-    # teradataml doesn't match column names on append.. and so to match / use same table schema as for byom predict
-    # example (see README.md), we must add empty json_report column and change column order manually (v17.0.0.4)
-    # CREATE TABLE pima_patient_predictions
+    # the rows are appended by column name, to the same table schema as for byom predict (see README.md)
+    # CREATE SET TABLE pima_patient_predictions
     # (
     #     job_id VARCHAR(255), -- comes from airflow on job execution
     #     PatientId BIGINT,    -- entity key as it is in the source data
     #     HasDiabetes BIGINT,   -- if model automatically extracts target
     #     json_report CLOB(1048544000) CHARACTER SET UNICODE  -- output of
     # )
-    # UNIQUE PRIMARY INDEX ( job_id, PatientId );
+    # PRIMARY INDEX ( job_id, PatientId );
+    # the table is created like this on the first write if it doesn't exist, json_report stays NULL as this model
+    # has no report
+    writer = PredictionWriter(context.dataset_info.predictions_table,
+                              schema_name=context.dataset_info.predictions_database,
+                              backend=TeradataBackend(fastload_min_rows=int(
+                                  hyperparams.get("writer_fastload_min_rows", FASTLOAD_MIN_ROWS))),
+                              batch_size=int(hyperparams.get("writer_batch_size", 10000)),
+                              sessions=int(hyperparams.get("writer_sessions", 4)),
+                              primary_index=["job_id", entity_key],  # Not possible to create UPI here, using next best thing
+                              set_table=True,
+                              types={"json_report": JSON_REPORT_TYPE})
     predictions_pdf["json_report"] = ""
-    predictions_pdf = predictions_pdf[["job_id", entity_key, target_name, "json_report"]]
-
-    copy_to_sql(df=predictions_pdf,
-                schema_name=context.dataset_info.predictions_database,
-                table_name=context.dataset_info.predictions_table,
-                index=False,
-                if_exists="append",
-                primary_index=["job_id", "PatientId"], # Not possible to create UPI here, using next best thing
-                set_table=True)
+    try:
+        writer.write(predictions_pdf[["job_id", entity_key, target_name, "json_report"]])
+    finally:
+        writer.close()
 
+    write_stats = writer.stats()
+    print(f"Wrote {write_stats['rows']} predictions at {write_stats['rows_per_s']:.0f} rows/s")
     print("Saved predictions in Teradata")
 
     # calculate stats
@@ -70,8 +117,44 @@ def score(context: ModelContext, **kwargs):
 # Add code required for RESTful API
 class ModelScorer(object):
 
-    def __init__(self):
-        self.model = joblib.load("artifacts/input/model.joblib")
+    def __init__(self, artifacts_path="artifacts/input"):
+        self.artifacts_path = artifacts_path
+        # optional cache of the predictions per feature row, see prediction_cache.py
+        cache_size = int(os.environ.get("PREDICTION_CACHE_SIZE", 0))
+        self.cache = PredictionCache(max_entries=cache_size) if cache_size > 0 else None
+        self.reload()
+
+    def reload(self):
+        """(Re)load the model artefact, the prediction cache only keeps its entries if the artefact is unchanged."""
+        model_path = os.path.join(self.artifacts_path, "model.joblib")
+        self.model = joblib.load(model_path)
+        if self.cache is not None:
+            self.cache.bind(artefact_hash(model_path))
+
+        # track drift of the request data if the training stats are available
+        self.drift = None
+        stats_path = os.path.join(self.artifacts_path, "data_stats.json")
+        if os.path.exists(stats_path):
+            features = getattr(self.model, "feature_names_in_", None)
+            self.drift = DriftMonitor.from_file(stats_path,
+                                                features=list(features) if features is not None else None)
 
     def predict(self, data):
-        return self.model.predict(data)
+        if self.cache is not None:
+            predictions = self.cache.predict(self.model.predict, data)
+        else:
+            predictions = self.model.predict(data)
+
+        # drift tracking is best effort, a request it can't handle must still get its predictions
+        if self.drift is not None:
+            try:
+                self.drift.update(data)
+            except Exception as e:
+                print(f"Failed to update the drift monitor: {e!r}")
+        return predictions
+
+    def metrics(self):
+        return {
+            "prediction_cache": self.cache.stats() if self.cache is not None else None,
+            "drift": self.drift.report() if self.drift is not None else None
+        }
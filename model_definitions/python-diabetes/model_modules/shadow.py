@@ -0,0 +1,83 @@
+"""
+Champion / challenger shadow scoring.
+
+The scoring data is read once and scored by the champion and every challenger model version. Only the champion
+predictions are stored, and each challenger is summarised against the champion by a few counts: rows, disagreements,
+flips in either direction and positive predictions, from which the disagreement rate and the lift of the challenger's
+positive rate over the champion's are derived. The counts add up across chunks, and the STO model computes the same
+report in-database (see its util.py).
+"""
+import json
+import os
+
+import joblib
+import numpy as np
+
+
+def load_models(shadow_models):
+    """Load the challengers {name: path}, where path is a model.joblib or an artifacts directory holding one."""
+    models = {}
+    for name, path in shadow_models.items():
+        if os.path.isdir(path):
+            path = os.path.join(path, "model.joblib")
+        models[name] = joblib.load(path)
+    return models
+
+
+def challenger_report(rows, champion_positives, challenger_positives, zero_to_one, one_to_zero):
+    disagreements = zero_to_one + one_to_zero
+    champion_rate = champion_positives / rows if rows else 0.0
+    challenger_rate = challenger_positives / rows if rows else 0.0
+    return {
+        "rows": int(rows),
+        "disagreements": int(disagreements),
+        "disagreement_rate": disagreements / rows if rows else 0.0,
+        "flips": {"0_to_1": int(zero_to_one), "1_to_0": int(one_to_zero)},
+        "champion_positive_rate": champion_rate,
+        "challenger_positive_rate": challenger_rate,
+        "lift": challenger_rate / champion_rate if champion_rate else None
+    }
+
+
+class ShadowComparison(object):
+    """Accumulates the disagreement counts of each challenger's predictions against the champion's."""
+
+    def __init__(self, champion, challengers):
+        self.champion = champion
+        self.counts = {name: np.zeros(5, dtype=np.int64) for name in challengers}
+
+    def update(self, champion_pred, challenger_preds):
+        champion_pred = np.asarray(champion_pred).ravel().astype(np.int64)
+        for name, pred in challenger_preds.items():
+            pred = np.asarray(pred).ravel().astype(np.int64)
+            self.counts[name] += [len(pred),
+                                  champion_pred.sum(),
+                                  pred.sum(),
+                                  np.count_nonzero((champion_pred == 0) & (pred == 1)),
+                                  np.count_nonzero((champion_pred == 1) & (pred == 0))]
+        return self
+
+    def report(self):
+        return {
+            "champion": self.champion,
+            "challengers": {name: challenger_report(*counts.tolist()) for name, counts in self.counts.items()}
+        }
+
+    def rows(self, job_id):
+        """One row per challenger for the shadow stats table."""
+        return [{
+            "job_id": job_id,
+            "champion": self.champion,
+            "challenger": name,
+            "num_rows": int(counts[0]),
+            "champion_positives": int(counts[1]),
+            "challenger_positives": int(counts[2]),
+            "flips_0_to_1": int(counts[3]),
+            "flips_1_to_0": int(counts[4])
+        } for name, counts in self.counts.items()]
+
+    def save(self, filename):
+        report = self.report()
+        with open(filename, "w+") as f:
+            json.dump(report, f, indent=2)
+        return report
@@ -1,7 +1,6 @@
 from xgboost import XGBClassifier
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.pipeline import Pipeline
-from nyoka import xgboost_to_pmml
 from teradataml import DataFrame
 from tmo import (
     record_training_stats,
@@ -9,8 +8,25 @@ from tmo import (
     tmo_create_context,
     ModelContext
 )
+from .data_loader import feature_frame, feature_matrix, load_compact, load_stats
+from .lazy_import import lazy_import
+from .warm_start import continue_boosting, lineage_record, load_parent, range_drift, scaler_decision
 
 import joblib
+import json
+import time
+
+# only needed for the pmml export at the end of training
+xgboost_to_pmml = lazy_import("nyoka", "xgboost_to_pmml")
+
+
+def load_training_data(sql, feature_names, target_name, data_stats):
+    """The teradataml DataFrame of the query, and its X (float32 matrix) and y in compact pandas dtypes."""
+    train_df = DataFrame.from_query(sql)
+    train_pdf, _ = load_compact(train_df, data_stats=data_stats, float32_columns=feature_names)
+
+    X_train = feature_frame(feature_matrix(train_pdf, feature_names), feature_names, index=train_pdf.index)
+    return train_df, X_train, train_pdf[target_name]
 
 
 def train(context: ModelContext, **kwargs):
@@ -18,25 +34,68 @@ def train(context: ModelContext, **kwargs):
 
     feature_names = context.dataset_info.feature_names
     target_name = context.dataset_info.target_names[0]
+    data_stats = load_stats(f"{context.artifact_input_path}/data_stats.json")
 
-    # read training dataset from Teradata and convert to pandas
-    train_df = DataFrame.from_query(context.dataset_info.sql)
-    train_pdf = train_df.to_pandas(all_rows=True)
-
-    # split data into X and y
-    X_train = train_pdf[feature_names]
-    y_train = train_pdf[target_name]
+    # read training dataset from Teradata
+    training_sql, training_scope = context.dataset_info.sql, "dataset"
+    train_df, X_train, y_train = load_training_data(training_sql, feature_names, target_name, data_stats)
 
     print("Starting training...")
-
-    # fit model to training data
-    model = Pipeline([('scaler', MinMaxScaler()),
-                      ('xgb', XGBClassifier(eta=context.hyperparams["eta"],
-                                            max_depth=context.hyperparams["max_depth"]))])
-
-    model.fit(X_train, y_train)
-
-    print("Finished training")
+    start = time.perf_counter()
+    hyperparams = context.hyperparams
+    xgb_params = {"eta": hyperparams["eta"], "max_depth": hyperparams["max_depth"]}
+
+    # continue boosting the parent version's model on the training data (the increment), see warm_start.py
+    warm_start_path = hyperparams.get("warm_start_path")
+    parent_lineage, parent_version, drift, warm_started, parent_rounds = None, None, None, False, 0
+    # the training stats describe all the data the model has seen, not only the rows of this training run
+    stats_sql = training_sql
+    if warm_start_path:
+        full_history_sql = hyperparams.get("full_history_sql")
+        if not full_history_sql:
+            raise ValueError("Warm starting requires the full_history_sql hyperparameter: the dataset only has the "
+                             "increment, the training stats and a model trained from scratch need the whole history")
+        stats_sql = full_history_sql
+
+        parent, parent_lineage = load_parent(warm_start_path)
+        parent_version = hyperparams.get("parent_version") or (parent_lineage or {}).get("model_version")
+        training_scope = "increment"
+        drift = range_drift(parent["scaler"], X_train)
+        warm_started = scaler_decision(hyperparams.get("scaler_policy", "auto"), drift,
+                                       float(hyperparams.get("scaler_tolerance", 0.1)))
+        if warm_started:
+            parent_rounds = parent["xgb"].get_booster().num_boosted_rounds()
+            print(f"Warm starting from {parent_version or warm_start_path} ({parent_rounds} boosting rounds)")
+            model = continue_boosting(parent, X_train, y_train, xgb_params,
+                                      rounds=int(hyperparams.get("warm_start_rounds", 20)))
+        else:
+            # the dataset only has the new rows, a model from scratch needs the whole history
+            print(f"Training from scratch on the full history, the features drifted up to "
+                  f"{float(drift.max()):.0%} out of the parent's scaler ranges")
+            training_sql, training_scope = full_history_sql, "full_history"
+            train_df, X_train, y_train = load_training_data(training_sql, feature_names, target_name, data_stats)
+
+    if not warm_started:
+        # fit model to training data
+        model = Pipeline([('scaler', MinMaxScaler()),
+                          ('xgb', XGBClassifier(**xgb_params))])
+
+        model.fit(X_train, y_train)
+
+    training_time = time.perf_counter() - start
+    total_rounds = model["xgb"].get_booster().num_boosted_rounds()
+    print(f"Finished training in {training_time:.2f}s ({total_rounds} boosting rounds)")
+
+    with open(f"{context.artifact_output_path}/lineage.json", "w+") as f:
+        json.dump(lineage_record(context.model_version, parent_version, warm_start_path, parent_lineage,
+                                 warm_started, drift, feature_names,
+                                 rounds_added=total_rounds - parent_rounds,
+                                 total_rounds=total_rounds,
+                                 training_rows=len(X_train),
+                                 training_sql=training_sql,
+                                 training_scope=training_scope,
+                                 stats_sql=stats_sql,
+                                 training_time=training_time), f, indent=2)
 
     # export model artefacts
     joblib.dump(model, f"{context.artifact_output_path}/model.joblib")
@@ -54,7 +113,9 @@ def train(context: ModelContext, **kwargs):
 
     feature_importance = model["xgb"].get_booster().get_score(importance_type="weight")
 
-    record_training_stats(train_df,
+    # computed in-database, so the full history of a warm started version isn't loaded here
+    stats_df = train_df if stats_sql == training_sql else DataFrame.from_query(stats_sql)
+    record_training_stats(stats_df,
                           features=feature_names,
                           targets=[target_name],
                           categorical=[target_name],
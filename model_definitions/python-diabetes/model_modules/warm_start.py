@@ -0,0 +1,92 @@
+"""
+Warm-start training from a prior model version.
+
+The parent's pipeline is loaded and its xgboost model continues boosting on the new data (`xgb_model`
+continuation), so the training time scales with the increment instead of the history.
+
+The parent's MinMaxScaler is kept: the parent's trees split on values scaled by it, so refitting it would move
+every split. Trees only depend on the order of the values, so new data slightly outside the fitted ranges (scaled
+values outside [0, 1]) is fine. When the data drifted further than `scaler_tolerance` out of the ranges, by
+default the model is instead fitted from scratch with a new scaler. As the dataset then only holds the increment,
+that requires the query of the full history (`full_history_sql`), the training fails without it.
+
+Every version records its parent in lineage.json, along with the rounds added, the scaler decision and the data it
+was trained on (the query, its rows and whether it is the increment, the full history or a plain dataset).
+"""
+import json
+import os
+
+import joblib
+import numpy as np
+
+SCALER_POLICIES = ("auto", "keep", "refit")
+
+
+def load_parent(path):
+    """The parent's pipeline and lineage from its artifacts directory (or model.joblib path)."""
+    directory = path if os.path.isdir(path) else os.path.dirname(path)
+    model = joblib.load(path if not os.path.isdir(path) else os.path.join(path, "model.joblib"))
+
+    lineage = None
+    if os.path.exists(os.path.join(directory, "lineage.json")):
+        with open(os.path.join(directory, "lineage.json"), "r") as f:
+            lineage = json.load(f)
+    return model, lineage
+
+
+def range_drift(scaler, X):
+    """Per feature, how far X falls outside the scaler's fitted range, as a fraction of that range."""
+    X = np.asarray(X)
+    data_range = np.where(scaler.data_range_ > 0, scaler.data_range_, 1.0)
+    below = np.maximum(scaler.data_min_ - np.nanmin(X, axis=0), 0)
+    above = np.maximum(np.nanmax(X, axis=0) - scaler.data_max_, 0)
+    return np.maximum(below, above) / data_range
+
+
+def scaler_decision(policy, drift, tolerance):
+    """Whether to keep the parent's scaler (and so warm start) given the range drift of the new data."""
+    if policy not in SCALER_POLICIES:
+        raise ValueError(f"Unsupported scaler policy {policy}, expected one of {SCALER_POLICIES}")
+    if policy == "keep":
+        return True
+    if policy == "refit":
+        return False
+    return float(np.max(drift)) <= tolerance
+
+
+def continue_boosting(parent, X, y, xgb_params, rounds):
+    """A pipeline with the parent's scaler and its xgboost model boosted `rounds` more rounds on X, y."""
+    from sklearn.pipeline import Pipeline
+    from xgboost import XGBClassifier
+
+    scaler = parent["scaler"]
+    xgb = XGBClassifier(n_estimators=rounds, **xgb_params)
+    xgb.fit(scaler.transform(X), y, xgb_model=parent["xgb"].get_booster())
+
+    # the steps are already fitted, the pipeline only chains them
+    return Pipeline([('scaler', scaler), ('xgb', xgb)])
+
+
+def lineage_record(model_version, parent_version, parent_path, parent_lineage, warm_started, drift, feature_names,
+                   rounds_added, total_rounds, training_rows, training_time, training_sql=None,
+                   training_scope="increment", stats_sql=None):
+    ancestors = list((parent_lineage or {}).get("ancestors", []))
+    if parent_version is not None:
+        ancestors.append(parent_version)
+    return {
+        "model_version": model_version,
+        "parent_version": parent_version,
+        "parent_path": parent_path,
+        "ancestors": ancestors,
+        "warm_started": warm_started,
+        "range_drift": dict(zip(feature_names, np.round(drift, 4).tolist())) if drift is not None else None,
+        "rounds_added": rounds_added,
+        "total_rounds": total_rounds,
+        "training_data": {
+            "scope": training_scope,
+            "sql": training_sql,
+            "rows": training_rows,
+            "stats_sql": stats_sql
+        },
+        "training_time_s": training_time
+    }
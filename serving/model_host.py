@@ -0,0 +1,407 @@
+"""
+Host serving many model versions' ModelScorers from a single process.
+
+Each model version is a directory laid out like a scoring container: the model code (a `model_modules` package,
+or the directory itself for BYOM models such as byom/pima) next to `artifacts/input`. Scorers are loaded on the
+first request for their version and kept resident while the total memory of the resident scorers fits in the
+memory budget, the least recently used versions being evicted to make room.
+
+Every version's code is imported as its own package (hosted_<n>), so versions of the same model
+definition don't clash. The scorers default to the relative `artifacts/input` path of a scoring container, so the
+version's absolute artefact path is passed to whichever of the `ARTIFACT_ARGUMENTS` the scorer takes (the process
+working directory is left alone, it is shared by every thread).
+
+Without a version, requests go to the model's latest version: the one marked with `latest=True` or `set_latest`,
+else the last registered. `register_directory` registers each model's versions oldest first by directory mtime.
+"""
+import gc
+import importlib
+import importlib.util
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_MEMORY_BUDGET_MB = int(os.environ.get("MODEL_HOST_MEMORY_BUDGET_MB", 4096))
+
+# scorer constructor arguments taking the artefact path, and the file within artifacts/input they point to
+ARTIFACT_ARGUMENTS = {
+    "artifacts_path": None,
+    "model_path": "model.onnx",
+    "config_path": "model_config.json"
+}
+
+
+def _rss_mb():
+    # current resident set size, from /proc on linux
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return None
+
+
+def _dir_size_mb(path):
+    size = 0
+    for root, _, files in os.walk(path):
+        size += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return size / 2 ** 20
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return float(values[min(len(values) - 1, int(round(q * (len(values) - 1))))])
+
+
+class HostedModel(object):
+    """A registered model version, its scorer while resident and its load / request statistics."""
+
+    def __init__(self, model_id, version, path, package=None, scorer_class="ModelScorer", scorer_kwargs=None,
+                 registration=0):
+        self.model_id = model_id
+        self.version = version
+        self.registration = registration
+        self.path = os.path.abspath(path)
+        if package is None:
+            package = "model_modules" if os.path.isdir(os.path.join(self.path, "model_modules")) else "."
+        self.package = package
+        self.scorer_class = scorer_class
+        self.scorer_kwargs = scorer_kwargs or {}
+
+        self.scorer = None
+        self.module_name = None
+        self.memory_mb = 0.0
+        self.load_lock = threading.Lock()
+
+        self.loads = 0
+        self.evictions = 0
+        self.load_time = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=1000)
+        self.last_used = None
+
+    @property
+    def key(self):
+        return self.model_id, self.version
+
+    def scorer_arguments(self, scorer_class):
+        """The scorer_kwargs, plus the absolute artefact path for the ARTIFACT_ARGUMENTS the scorer takes."""
+        artifacts_path = os.path.join(self.path, "artifacts", "input")
+        parameters = inspect.signature(scorer_class).parameters
+        kwargs = {name: artifacts_path if filename is None else os.path.join(artifacts_path, filename)
+                  for name, filename in ARTIFACT_ARGUMENTS.items() if name in parameters}
+        if not kwargs and not self.scorer_kwargs:
+            raise TypeError(f"{self.scorer_class} of {self.model_id}/{self.version} takes none of "
+                            f"{sorted(ARTIFACT_ARGUMENTS)}, pass its artefact paths in scorer_kwargs")
+        kwargs.update(self.scorer_kwargs)
+        return kwargs
+
+    def load(self, module_name):
+        """Import the version's code as `module_name` and construct its scorer, returning (scorer, load time, MB)."""
+        package_path = os.path.normpath(os.path.join(self.path, self.package))
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(package_path, "__init__.py"),
+                                                      submodule_search_locations=[package_path])
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = package
+
+        start = time.perf_counter()
+        rss_before = _rss_mb()
+        try:
+            spec.loader.exec_module(package)
+            scoring = importlib.import_module(f"{module_name}.scoring")
+            scorer_class = getattr(scoring, self.scorer_class)
+            scorer = scorer_class(**self.scorer_arguments(scorer_class))
+        except Exception:
+            self._unload_modules(module_name)
+            raise
+
+        load_time = time.perf_counter() - start
+        rss_after = _rss_mb()
+        # the rss growth is the best measure of the scorer's footprint, but it is shared with concurrent loads and
+        # dependencies already imported by other scorers are free, so never account less than the artefacts
+        artifacts_mb = _dir_size_mb(os.path.join(self.path, "artifacts", "input"))
+        memory_mb = max(rss_after - rss_before, artifacts_mb) if rss_before is not None else artifacts_mb
+        return scorer, load_time, memory_mb
+
+    @staticmethod
+    def _unload_modules(module_name):
+        for name in [n for n in sys.modules if n == module_name or n.startswith(module_name + ".")]:
+            del sys.modules[name]
+
+    def unload(self):
+        # called with the host lock held, which guards the residency and the statistics
+        scorer, self.scorer = self.scorer, None
+        close = getattr(scorer, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception as e:
+                print(f"Failed to close scorer of {self.model_id}/{self.version}: {str(e)}")
+        self._unload_modules(self.module_name)
+        self.module_name = None
+        self.memory_mb = 0.0
+        self.evictions += 1
+
+    def stats(self):
+        latencies = list(self.latencies)
+        return {
+            "model_id": self.model_id,
+            "version": self.version,
+            "resident": self.scorer is not None,
+            "memory_mb": self.memory_mb,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "load_time_s": self.load_time,
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_ms_p50": 1000 * _percentile(latencies, 0.5),
+            "latency_ms_p95": 1000 * _percentile(latencies, 0.95),
+            "last_used": self.last_used
+        }
+
+
+class ModelHost(object):
+    """
+    Routes requests to the scorers of registered model versions, loading them on demand and keeping the
+    resident ones within `memory_budget_mb` by evicting the least recently used.
+    """
+
+    def __init__(self, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+        self.memory_budget_mb = memory_budget_mb
+        self._models = {}
+        self._resident = OrderedDict()
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._counter = 0
+        self._registrations = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def register(self, model_id, version, path, latest=False, **kwargs):
+        """
+        Register the model version in directory `path`, marked as the model's latest version if `latest`. See
+        HostedModel for the optional arguments.
+        """
+        with self._lock:
+            self._registrations += 1
+            self._models[(model_id, str(version))] = HostedModel(model_id, str(version), path,
+                                                                 registration=self._registrations, **kwargs)
+            if latest:
+                self._latest[model_id] = str(version)
+
+    def set_latest(self, model_id, version):
+        """Route the requests without a version of `model_id` to `version`."""
+        with self._lock:
+            if (model_id, str(version)) not in self._models:
+                raise KeyError(f"Model {model_id} version {version} is not registered")
+            self._latest[model_id] = str(version)
+
+    def register_directory(self, root):
+        """Register every <root>/<model_id>/<version> directory holding artifacts/input, oldest version first."""
+        for model_id in sorted(os.listdir(root)):
+            model_path = os.path.join(root, model_id)
+            if not os.path.isdir(model_path):
+                continue
+            versions = [v for v in os.listdir(model_path)
+                        if os.path.isdir(os.path.join(model_path, v, "artifacts", "input"))]
+            # version names don't sort by age (e.g. "10" < "9", or uuids), the directories' mtime does
+            for version in sorted(versions, key=lambda v: (os.path.getmtime(os.path.join(model_path, v)), v)):
+                self.register(model_id, version, os.path.join(model_path, version))
+        return self
+
+    def versions(self, model_id):
+        """The versions of `model_id` in registration order."""
+        with self._lock:
+            models = [m for m in self._models.values() if m.model_id == model_id]
+        return [m.version for m in sorted(models, key=lambda m: m.registration)]
+
+    def latest(self, model_id):
+        """The marked latest version of `model_id`, else its last registered version."""
+        with self._lock:
+            if model_id in self._latest:
+                return self._latest[model_id]
+        versions = self.versions(model_id)
+        if not versions:
+            raise KeyError(f"Model {model_id} is not registered")
+        return versions[-1]
+
+    def _get(self, model_id, version=None):
+        if version is None:
+            version = self.latest(model_id)
+        model = self._models.get((model_id, str(version)))
+        if model is None:
+            raise KeyError(f"Model {model_id} version {version} is not registered")
+        return model
+
+    def _evict(self, keep):
+        # called with the host lock held
+        used = sum(m.memory_mb for m in self._resident.values())
+        for key in list(self._resident):
+            if used <= self.memory_budget_mb:
+                break
+            model = self._resident[key]
+            if model is keep or model.in_flight:
+                # never evict a scorer serving requests
+                continue
+            print(f"Evicting {model.model_id}/{model.version} ({model.memory_mb:.0f} MB)")
+            del self._resident[key]
+            used -= model.memory_mb
+            model.unload()
+        gc.collect()
+
+    def _acquire(self, model):
+        # the resident scorer of the model, loaded if needed, marked in flight so it isn't evicted while in use
+        with self._lock:
+            if model.scorer is not None:
+                self._resident.move_to_end(model.key)
+                model.in_flight += 1
+                self.hits += 1
+                return model.scorer
+
+        # load outside the host lock so other models keep serving, one load per model at a time
+        with model.load_lock:
+            with self._lock:
+                if model.scorer is not None:
+                    model.in_flight += 1
+                    self.hits += 1
+                    return model.scorer
+                self.misses += 1
+                self._counter += 1
+                module_name = f"hosted_{self._counter}"
+
+            print(f"Loading {model.model_id}/{model.version}")
+            scorer, load_time, memory_mb = model.load(module_name)
+            with self._lock:
+                model.scorer, model.module_name = scorer, module_name
+                model.load_time, model.memory_mb = load_time, memory_mb
+                model.loads += 1
+                model.in_flight += 1
+                self._resident[model.key] = model
+                self._evict(keep=model)
+                return model.scorer
+
+    def _release(self, model, latency=None, failed=False):
+        with self._lock:
+            model.in_flight -= 1
+            if latency is not None:
+                model.requests += 1
+                model.errors += int(failed)
+                model.latencies.append(latency)
+                model.last_used = time.time()
+
+    def scorer(self, model_id, version=None):
+        """The scorer of the model version (latest when None), loading it if not resident."""
+        model = self._get(model_id, version)
+        scorer = self._acquire(model)
+        self._release(model)
+        return scorer
+
+    def call(self, model_id, version, method, *args, **kwargs):
+        """Call `method` (e.g. predict or invoke) of the model version's scorer and record its latency."""
+        model = self._get(model_id, version)
+        scorer = self._acquire(model)
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = getattr(scorer, method)(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            self._release(model, latency=time.perf_counter() - start, failed=failed)
+
+    def predict(self, model_id, data, version=None):
+        return self.call(model_id, version, "predict", data)
+
+    def unload(self, model_id, version):
+        with self._lock:
+            model = self._resident.pop((model_id, str(version)), None)
+            if model is not None:
+                model.unload()
+
+    def stats(self):
+        with self._lock:
+            models = [m.stats() for m in self._models.values()]
+            lookups = self.hits + self.misses
+            return {
+                "memory_budget_mb": self.memory_budget_mb,
+                "memory_used_mb": sum(m.memory_mb for m in self._resident.values()),
+                "rss_mb": _rss_mb(),
+                "registered": len(self._models),
+                "resident": len(self._resident),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "models": models
+            }
+
+
+def _to_json_value(value):
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return value
+
+
+def make_handler(host):
+    """
+    HTTP handler routing
+    - POST /models/<model_id>[/<version>]/predict with the RESTful Serving Engine payload
+      {"data": {"ndarray": [[...]], "names": [...]}}
+    - POST /models/<model_id>[/<version>]/invoke with the query of the agentic scorers
+    - GET /stats
+    """
+    class Handler(BaseHTTPRequestHandler):
+
+        def _send(self, status, body):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                return self._send(200, host.stats())
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            parts = self.path.strip("/").split("/")
+            if len(parts) not in (3, 4) or parts[0] != "models" or parts[-1] not in ("predict", "invoke"):
+                return self._send(404, {"error": f"Unknown path {self.path}"})
+
+            model_id, version, method = parts[1], parts[2] if len(parts) == 4 else None, parts[-1]
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            try:
+                if method == "predict":
+                    import pandas as pd
+
+                    data = request["data"]
+                    data = pd.DataFrame(data["ndarray"], columns=data.get("names"))
+                    result = host.predict(model_id, data, version=version)
+                else:
+                    result = host.call(model_id, version, "invoke", request)
+                self._send(200, {"data": _to_json_value(result)})
+            except KeyError as e:
+                self._send(404, {"error": str(e)})
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(host, address="0.0.0.0", port=5000):
+    server = ThreadingHTTPServer((address, port), make_handler(host))
+    print(f"Serving {len(host._models)} model versions on {address}:{port}")
+    server.serve_forever()